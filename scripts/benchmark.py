@@ -0,0 +1,221 @@
+# End-to-end benchmark of generate_tests.py against the fake OpenAI server, with no network
+# access or API key. Each case builds a synthetic apis/ tree in a temporary directory, runs
+# the generator in a subprocess and records wall time, requests, tokens and peak memory.
+#
+#   python scripts/benchmark.py --output benchmark-results.json
+#   python scripts/benchmark.py --latency 0.3 --tokens-per-second 50 --error-rate 0.1
+#   python scripts/benchmark.py --baseline benchmark-results.json --tolerance 0.25
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+from fake_openai_server import make_server
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATOR = ROOT / "generate_tests.py"
+
+# name: (number of APIs, operations per spec, requirement lines per API)
+CASES = {
+    "small": (2, 2, 5),
+    "medium": (8, 10, 15),
+    "large": (20, 40, 30)
+}
+
+FIELD_TYPES = [
+    {"type": "string", "minLength": 3, "maxLength": 64},
+    {"type": "string", "format": "email"},
+    {"type": "integer", "minimum": 0, "maximum": 1000},
+    {"type": "boolean"},
+    {"type": "string", "enum": ["draft", "published", "archived"]}
+]
+
+# Metrics compared against --baseline; every one of them is "lower is better".
+COMPARED_METRICS = ["wall_seconds", "requests", "prompt_tokens", "completion_tokens", "peak_rss_mb"]
+
+
+def synthetic_spec(api, operations):
+    # An OpenAPI document with one create + read pair per resource, each resource schema
+    # referenced through components so spec slicing has $refs to resolve.
+    paths, schemas = {}, {}
+    for number in range(operations // 2 or 1):
+        resource = f"{api}_item{number}"
+        schema_name = f"{api.title()}Item{number}"
+        properties = {f"field{index}": dict(FIELD_TYPES[(number + index) % len(FIELD_TYPES)]) for index in range(6)}
+        schemas[schema_name] = {"type": "object", "required": ["field0", "field1"], "properties": properties}
+        reference = {"$ref": f"#/components/schemas/{schema_name}"}
+
+        paths[f"/{resource}"] = {"post": {
+            "summary": f"Create {resource.replace('_', ' ')}",
+            "operationId": f"create{schema_name}",
+            "requestBody": {"required": True, "content": {"application/json": {"schema": reference}}},
+            "responses": {"201": {"description": "Created"}, "400": {"description": "Invalid input"}}
+        }}
+        paths[f"/{resource}/{{id}}"] = {"get": {
+            "summary": f"Fetch {resource.replace('_', ' ')}",
+            "operationId": f"get{schema_name}",
+            "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+            "responses": {
+                "200": {"description": "Found", "content": {"application/json": {"schema": reference}}},
+                "404": {"description": "Not found"}
+            }
+        }}
+
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": f"Synthetic {api} API", "version": "1.0.0"},
+        "paths": paths,
+        "components": {"schemas": schemas}
+    }
+
+
+def synthetic_requirements(api, operations, lines):
+    # Mostly scenarios that need the model (response body checks), with some that the
+    # spec-derived tests answer on their own.
+    resources = [f"{api}_item{number}" for number in range(operations // 2 or 1)]
+    requirements = []
+    for number in range(lines):
+        resource = resources[number % len(resources)]
+        if number % 5 == 4:
+            requirements.append(f"Creating {resource.replace('_', ' ')} without field0 must fail with 400.")
+        else:
+            requirements.append(f"Fetching {resource.replace('_', ' ')} {number} must return the stored field{number % 6} in the body.")
+    return "\n".join(f"{number}. {line}" for number, line in enumerate(requirements, 1))
+
+
+def build_tree(root, apis, operations, lines):
+    for index in range(apis):
+        api = f"api{index:03d}"
+        api_dir = root / "apis" / api
+        api_dir.mkdir(parents=True)
+        (api_dir / "swagger.yaml").write_text(yaml.safe_dump(synthetic_spec(api, operations), sort_keys=False))
+        (api_dir / "requirements.txt").write_text(synthetic_requirements(api, operations, lines))
+
+
+def spec_bytes(root):
+    return sum(path.stat().st_size for path in (root / "apis").glob("*/swagger.yaml"))
+
+
+def run_case(name, server, extra_args, repeat):
+    apis, operations, lines = CASES[name]
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix=f"testgen-bench-{name}-") as directory:
+            root = Path(directory)
+            build_tree(root, apis, operations, lines)
+            server.fake.reset()
+            env = {
+                **os.environ,
+                "OPENAI_API_KEY": "fake",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1"
+            }
+
+            started = time.perf_counter()
+            process = subprocess.Popen([sys.executable, str(GENERATOR), "--no-cache", *extra_args], cwd=root, env=env,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            output = process.stdout.read()
+            # wait4 reports the resource usage of this child only; ru_maxrss is in KiB on Linux.
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - started
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode:
+                sys.stdout.write(output.decode("utf-8", "replace"))
+                raise SystemExit(f"❌ {name}: generate_tests.py exited with {process.returncode}")
+
+            tests = sum(path.read_text().count("\ndef test_") for path in (root / "tests").glob("*/test_*_generated.py"))
+            peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+            with server.fake.lock:
+                stats = dict(server.fake.stats)
+            runs.append({
+                "wall_seconds": round(wall, 3),
+                "requests": stats.get("requests", 0),
+                "rate_limited": stats.get("rate_limited", 0),
+                "prompt_tokens": stats.get("prompt_tokens", 0),
+                "completion_tokens": stats.get("completion_tokens", 0),
+                "peak_rss_mb": round(peak_rss, 1),
+                "tests_written": tests,
+                "spec_bytes": spec_bytes(root)
+            })
+
+    # The fastest run is the least noisy estimate of wall time; the counters are deterministic.
+    best = min(runs, key=lambda run: run["wall_seconds"])
+    return {
+        "apis": apis,
+        "operations_per_api": operations,
+        "requirements_per_api": lines,
+        **best,
+        "wall_seconds_runs": [run["wall_seconds"] for run in runs]
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, case in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), case.get(metric)
+            if before and after is not None and after > before * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {before} → {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate_tests.py against a local fake OpenAI server.")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest one is reported")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake model latency before the first token (seconds)")
+    parser.add_argument("--tokens-per-second", type=float, default=2000, help="Fake model completion throughput")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--rpm", type=int, default=None, help="Fake requests/min limit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--baseline", type=Path, help="Earlier results to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative increase over the baseline")
+    parser.add_argument("generator_args", nargs="*", help="Extra arguments for generate_tests.py (after --)")
+    args = parser.parse_args()
+
+    server = make_server(rpm=args.rpm, error_rate=args.error_rate, seed=args.seed,
+                         latency=args.latency, tokens_per_second=args.tokens_per_second)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "server": {"latency": args.latency, "tokens_per_second": args.tokens_per_second,
+                   "error_rate": args.error_rate, "rpm": args.rpm},
+        "generator_args": args.generator_args,
+        "cases": {}
+    }
+    try:
+        for name in args.cases:
+            case = run_case(name, server, args.generator_args, args.repeat)
+            results["cases"][name] = case
+            print(f"⏱️  {name}: {case['wall_seconds']}s, {case['requests']} requests, "
+                  f"{case['prompt_tokens'] + case['completion_tokens']} tokens, {case['peak_rss_mb']} MB peak, "
+                  f"{case['tests_written']} tests")
+    finally:
+        server.shutdown()
+
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"✅ Results written to: {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# Local OpenAI-compatible chat completions server for exercising generate_tests.py without
+# an API key: canned scenarios and tests, optional streaming, configurable latency and token
+# throughput, configurable 429s, and tests that fail pytest collection until repaired.
+#
+#   python scripts/fake_openai_server.py --port 8089 --rpm 30 --error-rate 0.2
+#   python scripts/fake_openai_server.py --port 8089 --latency 0.5 --tokens-per-second 40
+#   python scripts/fake_openai_server.py --port 8089 --broken-rate 0.3
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python generate_tests.py --no-cache
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def scenario_answer(prompt):
+    requirements = prompt.split("\n\n")[1] if "\n\n" in prompt else prompt
+    lines = [line.strip().lstrip("0123456789.-) ") for line in requirements.splitlines() if line.strip()]
+    return "\n".join(f"- Test that {line[0].lower()}{line[1:]}" for line in lines if line)
+
+
+def test_function(scenario, index=0, broken=False):
+    # A broken test imports a module that does not exist, so it parses but fails collection.
+    name = "_".join(re.findall(r"[a-z0-9]+", scenario.lower())[:8]) or f"scenario_{index}"
+    return (
+        "import requests\n"
+        + ("from test_helpers import make_credentials\n" if broken else "")
+        + "\n"
+        f"def test_{name}():\n"
+        + ("    payload = make_credentials()\n" if broken else "    payload = {'username': 'user@example.com', 'password': 'secret'}\n")
+        + "    response = requests.post('http://localhost:8000/login', json=payload)\n"
+        "    assert response.status_code in (200, 401)\n"
+    )
+
+
+def answer(messages, broken=lambda: False):
+    prompt = messages[-1]["content"]
+    if "fails before it can run" in prompt:
+        scenario = prompt.split("for the scenario:\n", 1)[1].split("\n", 1)[0]
+        return f"Fixed:\n\n```python\n{test_function(scenario)}```"
+    if "these test scenarios:" in prompt:
+        block = prompt.split("these test scenarios:\n", 1)[1].split("\n\n", 1)[0]
+        scenarios = [line.split(". ", 1)[-1] for line in block.splitlines() if line.strip()]
+        tests = [{"scenario": number, "code": test_function(scenario, number, broken())} for number, scenario in enumerate(scenarios, 1)]
+        return json.dumps({"tests": tests})
+    if "test scenario:" in prompt:
+        scenario = prompt.split("test scenario:\n", 1)[1].split("\n", 1)[0]
+        return f"Here is the test:\n\n```python\n{test_function(scenario, broken=broken())}```\n\nIt posts to the endpoint and checks the status code."
+    return scenario_answer(prompt)
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+class FakeOpenAI:
+    # Shared state of the server: request counters, the requests/min window and the simulated
+    # model speed (seconds before the first token, then completion tokens per second).
+
+    def __init__(self, rpm=None, error_rate=0.0, seed=None, latency=0.0, tokens_per_second=None, broken_rate=0.0):
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.broken_rate = broken_rate
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.random = random.Random(seed)
+        self.window = deque()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def admit(self):
+        # Returns (allowed, headers) for one incoming request.
+        with self.lock:
+            now = time.monotonic()
+            while self.window and now - self.window[0] >= 60:
+                self.window.popleft()
+
+            headers = {}
+            if self.rpm:
+                reset = 60 - (now - self.window[0]) if self.window else 0
+                headers = {
+                    "x-ratelimit-limit-requests": str(self.rpm),
+                    "x-ratelimit-remaining-requests": str(max(0, self.rpm - len(self.window) - 1)),
+                    "x-ratelimit-reset-requests": f"{reset:.3f}s"
+                }
+                if len(self.window) >= self.rpm:
+                    headers["retry-after-ms"] = str(int(reset * 1000))
+                    return False, headers
+
+            if self.random.random() < self.error_rate:
+                headers["retry-after-ms"] = "200"
+                return False, headers
+
+            self.window.append(now)
+            return True, headers
+
+    def broken(self):
+        with self.lock:
+            return self.random.random() < self.broken_rate
+
+    def token_delay(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def reset(self):
+        with self.lock:
+            self.window.clear()
+            self.stats.clear()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.server.fake.lock:
+                self._send_json(200, dict(self.server.fake.stats))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        fake = self.server.fake
+        allowed, headers = fake.admit()
+        with fake.lock:
+            fake.stats["requests"] += 1
+            if not allowed:
+                fake.stats["rate_limited"] += 1
+        if not allowed:
+            error = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            self._send_json(429, error, headers)
+            return
+
+        content = answer(body.get("messages", []), fake.broken)
+        prompt_tokens = estimate_tokens(json.dumps(body.get("messages", [])))
+        completion_tokens = estimate_tokens(content)
+        with fake.lock:
+            fake.stats["prompt_tokens"] += prompt_tokens
+            fake.stats["completion_tokens"] += completion_tokens
+
+        time.sleep(fake.latency)
+        if body.get("stream"):
+            usage = None
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+            self._stream(body, content, headers, usage)
+            return
+
+        time.sleep(fake.token_delay(completion_tokens))
+
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }, headers)
+
+    def _stream(self, body, content, headers, usage=None):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, usage=None):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        event({"role": "assistant", "content": ""})
+        for token in re.findall(r"\s*\S+|\s+", content):
+            time.sleep(self.server.fake.token_delay(estimate_tokens(token)))
+            event({"content": token})
+        event({}, "stop")
+        if usage is not None:
+            event(None, usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host="127.0.0.1", port=0, rpm=None, error_rate=0.0, seed=None, latency=0.0, tokens_per_second=None,
+                broken_rate=0.0):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeOpenAI(rpm, error_rate, seed, latency, tokens_per_second, broken_rate)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--rpm", type=int, default=None, help="Requests per minute before answering 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a random 429")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token of every answer")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Completion token throughput (default: unlimited)")
+    parser.add_argument("--broken-rate", type=float, default=0.0, help="Fraction of tests that fail pytest collection")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.rpm, args.error_rate, args.seed, args.latency, args.tokens_per_second,
+                         args.broken_rate)
+    print(f"🤖 Fake OpenAI server on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,275 @@
+# Local stand-in for the APIs under apis/, built from their swagger.yaml files, to run the
+# generated suites (and the HTTP profiler) against without a staging environment. JSON
+# request bodies are checked against the operation's schema (required fields, types, length
+# and range bounds, enums, email format): valid requests get the first documented 2xx with a
+# body built from the response schema, invalid ones the documented 400/422. Credentials
+# containing "invalid" or "wrong" get the documented 401, and a second create with the same
+# email or username the documented 409. A 201 to a POST carries a Location that can be
+# fetched and deleted again.
+#
+#   python scripts/stub_api_server.py --port 8000
+#   python scripts/stub_api_server.py --port 8000 --latency 0.02 --slow /login=0.3
+#   API_BASE_URL=http://127.0.0.1:8000 python -m pytest -p testgen.profiler --profile-http tests/
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from testgen.loader import parse_spec  # noqa: E402
+from testgen.spec import HTTP_METHODS  # noqa: E402
+from testgen.synthesis import sample_value  # noqa: E402
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+UNIQUE_FIELDS = ("email", "username")
+BAD_CREDENTIAL_WORDS = ("invalid", "wrong")
+JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,)
+}
+
+
+def schema_errors(spec_index, schema, value, where="body"):
+    # The first few reasons `value` does not satisfy `schema`; only the checks the
+    # spec-derived tests exercise.
+    schema = spec_index.resolve(schema)
+    if not schema:
+        return []
+    kind = schema.get("type") or ("object" if "properties" in schema else None)
+    if kind in JSON_TYPES and (not isinstance(value, JSON_TYPES[kind]) or (kind != "boolean" and isinstance(value, bool))):
+        return [f"{where} must be of type {kind}"]
+    if schema.get("enum") and value not in schema["enum"]:
+        return [f"{where} must be one of {schema['enum']}"]
+
+    errors = []
+    if isinstance(value, str):
+        if len(value) < schema.get("minLength", 0):
+            errors.append(f"{where} must be at least {schema['minLength']} characters")
+        if "maxLength" in schema and len(value) > schema["maxLength"]:
+            errors.append(f"{where} must be at most {schema['maxLength']} characters")
+        if schema.get("format") == "email" and not EMAIL_RE.match(value):
+            errors.append(f"{where} must be an email address")
+    elif isinstance(value, (int, float)):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{where} must be at least {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{where} must be at most {schema['maximum']}")
+    elif isinstance(value, dict):
+        for name in schema.get("required") or []:
+            if name not in value or value[name] in (None, ""):
+                errors.append(f"{where}.{name} is required")
+        for name, prop in (schema.get("properties") or {}).items():
+            if name in value and value[name] is not None:
+                errors += schema_errors(spec_index, prop, value[name], f"{where}.{name}")
+    elif isinstance(value, list):
+        for index, element in enumerate(value):
+            errors += schema_errors(spec_index, schema.get("items") or {}, element, f"{where}[{index}]")
+    return errors[:5]
+
+
+class Route:
+    def __init__(self, api, spec_index, path, method, operation):
+        self.api = api
+        self.spec_index = spec_index
+        self.path = path
+        self.method = method.upper()
+        self.operation = operation
+        self.pattern = re.compile("^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path.rstrip("/"))) + "/?$")
+        self.responses = {str(code): spec_index.resolve(response) for code, response in (operation.get("responses") or {}).items()}
+
+    def status(self, *codes, default):
+        return next((code for code in codes if code in self.responses), default)
+
+    def success(self):
+        return int(next((code for code in sorted(self.responses) if code.startswith("2")), "200"))
+
+    def body_schema(self):
+        body = self.spec_index.resolve(self.operation.get("requestBody") or {})
+        media = (body.get("content") or {}).get("application/json") or {}
+        return self.spec_index.resolve(media.get("schema") or {}) if isinstance(media, dict) else {}
+
+    def response_body(self, code):
+        content = (self.responses.get(str(code)) or {}).get("content") or {}
+        media = content.get("application/json") or {}
+        schema = media.get("schema") if isinstance(media, dict) else None
+        if schema:
+            return sample_value(self.spec_index, schema)
+        return {"message": (self.responses.get(str(code)) or {}).get("description") or "OK"}
+
+
+class StubApi:
+    # Routes, created resources and per-operation counters, shared by the handler threads.
+
+    def __init__(self, apis_dir, latency=0.0, jitter=0.0, slow=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow = slow or {}
+        self.random = random.Random(seed)
+        self.routes = []
+        self.resources = {}
+        self.unique = set()
+        self.next_id = 1
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        for swagger_file in sorted(Path(apis_dir).glob("*/swagger.yaml")):
+            spec_index = parse_spec(swagger_file)
+            for path, method, operation, _ in spec_index.operations:
+                if method in HTTP_METHODS:
+                    self.routes.append(Route(swagger_file.parent.name, spec_index, path, method, operation))
+
+    def delay(self, path):
+        # The longest --slow prefix that matches, otherwise --latency, plus up to --jitter.
+        matches = [prefix for prefix in self.slow if path.startswith(prefix)]
+        base = self.slow[max(matches, key=len)] if matches else self.latency
+        with self.lock:
+            return base + self.random.uniform(0, self.jitter) if self.jitter else base
+
+    def handle(self, method, path, raw_body):
+        # Returns (status, body, headers).
+        with self.lock:
+            self.stats[f"{method} {path}"] += 1
+            if path in self.resources:
+                if method == "GET":
+                    return 200, self.resources[path], {}
+                if method == "DELETE":
+                    del self.resources[path]
+                    return 204, None, {}
+
+        routes = [route for route in self.routes if route.pattern.match(path)]
+        if not routes:
+            return 404, {"error": f"No operation for {path}"}, {}
+        route = next((route for route in routes if route.method == method), None)
+        if route is None:
+            return 405, {"error": f"{method} is not allowed on {path}"}, {"Allow": ", ".join(route.method for route in routes)}
+
+        schema = route.body_schema()
+        body = None
+        if schema:
+            try:
+                body = json.loads(raw_body or b"null")
+            except ValueError:
+                return int(route.status("400", "422", default="400")), {"error": "Body is not valid JSON"}, {}
+            errors = schema_errors(route.spec_index, schema, body)
+            if errors:
+                return int(route.status("400", "422", default="400")), {"error": "; ".join(errors)}, {}
+
+        values = body if isinstance(body, dict) else {}
+        if "401" in route.responses and any(
+            word in str(value).lower() for value in values.values() for word in BAD_CREDENTIAL_WORDS
+        ):
+            return 401, {"error": "Invalid credentials"}, {}
+
+        code = route.success()
+        with self.lock:
+            keys = {(route.api, route.path, field, str(values[field]).lower()) for field in UNIQUE_FIELDS if field in values}
+            if "409" in route.responses and keys & self.unique:
+                return 409, {"error": "Already exists"}, {}
+            self.unique |= keys
+
+            response = route.response_body(code)
+            headers = {}
+            if method == "POST" and code == 201:
+                location = f"{path.rstrip('/')}/{self.next_id}"
+                if isinstance(response, dict):
+                    response = {**{key: value for key, value in values.items() if "password" not in key.lower()},
+                                **response, "id": self.next_id}
+                self.next_id += 1
+                self.resources[location] = response
+                headers["Location"] = location
+        return code, response, headers
+
+    def reset(self):
+        with self.lock:
+            self.resources.clear()
+            self.unique.clear()
+            self.stats.clear()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in one write; separate small writes meet the client's delayed
+    # ACK and add ~40ms to every response, which would swamp the latency being profiled.
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/__stats":
+            with self.server.stub.lock:
+                self._send(200, dict(self.server.stub.stats))
+            return
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = do_POST
+
+    def _dispatch(self):
+        stub = self.server.stub
+        path = urlsplit(self.path).path
+        raw_body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        time.sleep(stub.delay(path))
+        status, body, headers = stub.handle(self.command, path, raw_body)
+        self._send(status, body, headers)
+
+    def _send(self, status, payload, headers=None):
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+
+def make_server(host="127.0.0.1", port=0, apis_dir=ROOT / "apis", latency=0.0, jitter=0.0, slow=None, seed=None):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.stub = StubApi(apis_dir, latency, jitter, slow, seed)
+    return server
+
+
+def parse_slow(value):
+    prefix, separator, seconds = value.rpartition("=")
+    if not separator or not prefix.startswith("/"):
+        raise argparse.ArgumentTypeError("expected PATH=SECONDS, e.g. /login=0.3")
+    return prefix, float(seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub HTTP server for the APIs described in apis/*/swagger.yaml.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--apis-dir", type=Path, default=ROOT / "apis")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds, at random")
+    parser.add_argument("--slow", type=parse_slow, action="append", default=[], metavar="PATH=SECONDS",
+                        help="Latency for paths starting with PATH instead of --latency; repeatable")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.apis_dir, args.latency, args.jitter, dict(args.slow), args.seed)
+    operations = ", ".join(f"{route.method} {route.path}" for route in server.stub.routes) or "none"
+    print(f"🧪 Stub API on http://{args.host}:{server.server_address[1]} ({operations})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
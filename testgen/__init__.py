@@ -0,0 +1,8 @@
+# Generates pytest API tests from informal requirements and OpenAPI specs.
+#
+#   from testgen import Options, generate
+#   generate("apis/login", options=Options(batch_size=4))
+#
+# Importing the package does not import openai; that happens when generation starts.
+from .config import GENERATOR_VERSION
+from .pipeline import Options, discover_apis, generate, generate_async, select_shard
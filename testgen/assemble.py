@@ -0,0 +1,474 @@
+import ast
+import re
+import textwrap
+
+from .sections import SCENARIO_MARKER
+
+FENCE_RE = re.compile(r"```[ \t]*(?:python3?|py)?[ \t]*\n(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+BASE_URL_LINE = 'BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")'
+SESSION_FIXTURE = "api_session"
+HTTP_VERBS = {"get", "post", "put", "patch", "delete", "head", "options", "request"}
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+$")
+UNIQUE_ID_FIXTURE = "unique_id"
+LOCAL_ORIGIN_RE = re.compile(r"https?://(?:localhost|127\.0\.0\.1|0\.0\.0\.0)(?::\d+)?(?=[/?#{\"']|$)")
+# Written next to every generated test file. One pooled session is shared by all tests of the
+# directory, and relative URLs are resolved against API_BASE_URL.
+CONFTEST_TEMPLATE = '''# Generated by generate_tests.py; changes will be overwritten.
+import os
+from urllib.parse import urljoin
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "32"))
+
+
+class BaseUrlSession(requests.Session):
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip("/") + "/"
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, urljoin(self.base_url, str(url).lstrip("/")), *args, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def base_url():
+    return BASE_URL
+
+
+@pytest.fixture(scope="session")
+def pooled_session(base_url):
+    session = BaseUrlSession(base_url)
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    yield session
+    session.close()
+'''
+SHARED_SESSION_FIXTURE = '''
+
+@pytest.fixture(scope="session")
+def api_session(pooled_session):
+    return pooled_session
+'''
+# With --isolated every test gets its own view of the pool that deletes what the test created
+# (201 responses with a Location header), unique data via `unique_id`, and TEST_SHARD=i/n
+# selects a stable slice of the tests so suites can be split across processes and machines.
+ISOLATED_FIXTURES = '''
+
+API_NAME = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+
+class IsolatedSession:
+    def __init__(self, session):
+        self._session = session
+        self.created = []
+
+    def request(self, method, url, *args, **kwargs):
+        response = self._session.request(method, url, *args, **kwargs)
+        if method.upper() == "POST" and response.status_code == 201 and response.headers.get("Location"):
+            self.created.append(response.headers["Location"])
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request("PUT", url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.request("PATCH", url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request("OPTIONS", url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+@pytest.fixture
+def api_session(pooled_session):
+    session = IsolatedSession(pooled_session)
+    yield session
+    for location in reversed(session.created):
+        try:
+            pooled_session.delete(location)
+        except requests.RequestException:
+            pass
+
+
+@pytest.fixture
+def unique_id():
+    return uuid.uuid4().hex[:12]
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "api(name): API directory the generated test belongs to")
+    config.addinivalue_line("markers", "operation(method, path): HTTP operation the generated test exercises")
+
+
+def pytest_collection_modifyitems(config, items):
+    shard = os.getenv("TEST_SHARD")
+    if not shard:
+        return
+
+    index, total = (int(part) for part in shard.split("/"))
+    selected, deselected = [], []
+    for item in items:
+        marker = item.get_closest_marker("api")
+        mine = marker is not None and marker.kwargs.get("name") == API_NAME
+        if mine and zlib.crc32(item.nodeid.encode("utf-8")) % total != index - 1:
+            deselected.append(item)
+        else:
+            selected.append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+'''
+
+
+def extract_code(raw_content):
+    # Keep only the fenced code blocks of a model answer (or the whole answer when it has
+    # no fences) that parse as Python. Returns None when nothing usable is left.
+    raw_content = raw_content or ""
+    blocks = FENCE_RE.findall(raw_content) or [raw_content]
+
+    valid = []
+    for block in blocks:
+        block = textwrap.dedent(block).strip()
+        if not block:
+            continue
+        try:
+            ast.parse(block)
+        except (SyntaxError, ValueError):
+            continue
+        valid.append(block)
+
+    return "\n\n".join(valid) if valid else None
+
+
+def split_imports(source):
+    # Returns the top-level import statements of source and the source without them.
+    tree = ast.parse(source)
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    dropped = {line for node in imports for line in range(node.lineno - 1, node.end_lineno)}
+    body = "\n".join(line for index, line in enumerate(source.splitlines()) if index not in dropped)
+    return imports, re.sub(r"\n{3,}", "\n\n", body).strip()
+
+
+def imported_names(node):
+    for alias in node.names:
+        if alias.asname:
+            yield alias.asname
+        elif isinstance(node, ast.Import):
+            yield alias.name.split(".")[0]
+        else:
+            yield alias.name
+
+
+def single_imports(nodes):
+    # One statement per imported name, so `import pytest` and `import pytest, requests` are
+    # recognised as the same import of pytest.
+    for node in nodes:
+        for alias in node.names:
+            if isinstance(node, ast.Import):
+                yield ast.Import(names=[alias])
+            else:
+                yield ast.ImportFrom(module=node.module, names=[alias], level=node.level)
+
+
+def rename_collisions(body, defined):
+    # Give top-level functions/classes that were already defined earlier in the file a
+    # numbered name, so pytest collects every test instead of only the last definition.
+    # References inside the section (calls, fixture parameters, usefixtures names) follow the
+    # rename, so a test keeps using its own section's fixtures and helpers.
+    tree = ast.parse(body)
+    renames = {}
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        name = node.name
+        if name in defined:
+            suffix = 2
+            while f"{name}_{suffix}" in defined:
+                suffix += 1
+            name = f"{name}_{suffix}"
+            renames[node.name] = name
+        defined.add(name)
+    if not renames:
+        return body
+
+    edits = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in renames:
+            edits.append((node.lineno, node.col_offset, node.end_lineno, node.end_col_offset, renames[node.id]))
+        elif isinstance(node, ast.arg) and node.arg in renames:
+            end = node.col_offset + len(node.arg.encode("utf-8"))
+            edits.append((node.lineno, node.col_offset, node.lineno, end, renames[node.arg]))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "usefixtures":
+            edits.extend(
+                (arg.lineno, arg.col_offset, arg.end_lineno, arg.end_col_offset, repr(renames[arg.value]))
+                for arg in node.args if isinstance(arg, ast.Constant) and arg.value in renames
+            )
+    lines = apply_edits(body.splitlines(), edits)
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name in renames:
+            keyword = "class" if isinstance(node, ast.ClassDef) else "def"
+            line = lines[node.lineno - 1]
+            lines[node.lineno - 1] = re.sub(rf"\b{keyword}\s+{re.escape(node.name)}\b", f"{keyword} {renames[node.name]}", line, count=1)
+    return "\n".join(lines)
+
+
+def apply_edits(lines, edits):
+    # edits are (lineno, col, end_lineno, end_col, text) using ast positions, whose columns
+    # are UTF-8 byte offsets.
+    def to_char(line, col):
+        return len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+
+    for lineno, col, end_lineno, end_col, text in sorted(edits, reverse=True):
+        first, last = lines[lineno - 1], lines[end_lineno - 1]
+        merged = first[:to_char(first, col)] + text + last[to_char(last, end_col):]
+        lines[lineno - 1:end_lineno] = merged.split("\n")
+    return lines
+
+
+def local_origin_edits(source, node):
+    # Edits that drop hard-coded local origins from the string literals under node.
+    # Constants nested in f-strings have no position of their own before Python 3.12;
+    # the f-string as a whole is rewritten instead.
+    edits = []
+    nested = {id(value) for joined in ast.walk(node) if isinstance(joined, ast.JoinedStr) for value in joined.values}
+    for literal in ast.walk(node):
+        is_string = isinstance(literal, ast.Constant) and isinstance(literal.value, str)
+        if not (is_string or isinstance(literal, ast.JoinedStr)) or id(literal) in nested:
+            continue
+        segment = ast.get_source_segment(source, literal)
+        if segment is None or not segment.lstrip("rRbBuUfF").startswith(("'", '"')):
+            continue
+        rewritten = LOCAL_ORIGIN_RE.sub("", segment, count=1)
+        if rewritten != segment:
+            edits.append((literal.lineno, literal.col_offset, literal.end_lineno, literal.end_col_offset, rewritten))
+    return edits
+
+
+def use_session_fixture(body):
+    # Rewrite test functions to send requests through the pooled `api_session` fixture from the
+    # generated conftest.py: requests.<verb>(...) becomes api_session.<verb>(...), hard-coded
+    # local origins (localhost:8000, localhost:5000, ...) are dropped so URLs resolve against
+    # the configured base URL, and the fixture is added to the function's parameters.
+    # Module-level constants lose their local origins too, and a section's own BASE_URL
+    # assignment is dropped so it cannot rebind the file's configurable one.
+    lines = body.splitlines()
+    edits = []
+
+    for node in ast.parse(body).body:
+        if isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if any(isinstance(target, ast.Name) and target.id == "BASE_URL" for target in targets):
+                if node.end_lineno < len(lines):
+                    edits.append((node.lineno, 0, node.end_lineno + 1, 0, ""))
+                else:
+                    edits.append((node.lineno, 0, node.end_lineno, len(lines[-1].encode("utf-8")), ""))
+            else:
+                edits.extend(local_origin_edits(body, node))
+            continue
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) or not node.name.startswith("test"):
+            continue
+
+        calls = [
+            call.func.value for call in ast.walk(node)
+            if isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+            and isinstance(call.func.value, ast.Name) and call.func.value.id == "requests"
+            and call.func.attr in HTTP_VERBS
+        ]
+        if not calls:
+            continue
+
+        for name in calls:
+            edits.append((name.lineno, name.col_offset, name.end_lineno, name.end_col_offset, SESSION_FIXTURE))
+        edits.extend(local_origin_edits(body, node))
+
+        parameters = [arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs]
+        if SESSION_FIXTURE not in parameters:
+            no_parameters = not parameters and node.args.vararg is None and node.args.kwarg is None
+            replacement = f"def {node.name}({SESSION_FIXTURE})" if no_parameters else f"def {node.name}({SESSION_FIXTURE}, "
+            pattern = rf"def\s+{re.escape(node.name)}\s*\(\s*\)" if no_parameters else rf"def\s+{re.escape(node.name)}\s*\("
+            line = lines[node.lineno - 1]
+            match = re.search(pattern, line)
+            if match:
+                start, end = (len(line[:offset].encode("utf-8")) for offset in match.span())
+                edits.append((node.lineno, start, node.lineno, end, replacement))
+
+    return "\n".join(apply_edits(lines, edits))
+
+
+def isolate_test_data(body, api_name):
+    # Make generated tests safe to run in parallel: every plain email literal in a test gets the
+    # per-test `unique_id` folded in (a test that registers the same address twice still does,
+    # but no two tests share one), and each test is marked with its API and operation so suites
+    # can be selected and sharded. Already isolated code is left as it is.
+    lines = body.splitlines()
+    edits = []
+    signatures = []
+    decorators = []
+
+    for node in ast.parse(body).body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) or not node.name.startswith("test"):
+            continue
+
+        # Only the body: decorator arguments and parameter defaults are evaluated at module
+        # level, where there is no unique_id to fold in.
+        statements = list(walk_body(node))
+        nested = {id(value) for joined in statements if isinstance(joined, ast.JoinedStr) for value in joined.values}
+        emails = [
+            literal for literal in statements
+            if isinstance(literal, ast.Constant) and isinstance(literal.value, str)
+            and id(literal) not in nested and EMAIL_RE.match(literal.value)
+        ]
+        for literal in emails:
+            local, domain = literal.value.split("@", 1)
+            edits.append((literal.lineno, literal.col_offset, literal.end_lineno, literal.end_col_offset,
+                          f'f"{local}+{{{UNIQUE_ID_FIXTURE}}}@{domain}"'))
+
+        parameters = [arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs]
+        if emails and UNIQUE_ID_FIXTURE not in parameters:
+            signatures.append((node.lineno, node.name, not parameters and node.args.vararg is None and node.args.kwarg is None))
+
+        marked = any("mark.api" in ast.unparse(decorator) for decorator in node.decorator_list)
+        if not marked:
+            first_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            indent = re.match(r"\s*", lines[first_line - 1]).group()
+            markers = [f"{indent}@pytest.mark.api(name={api_name!r})"]
+            operation = infer_operation(node)
+            if operation:
+                method, path = operation
+                markers.append(f"{indent}@pytest.mark.operation(method={method!r}, path={path!r})")
+            decorators.append((first_line, markers))
+
+    lines = apply_edits(lines, edits)
+    for lineno, name, no_parameters in signatures:
+        replacement = f"def {name}({UNIQUE_ID_FIXTURE})" if no_parameters else f"def {name}({UNIQUE_ID_FIXTURE}, "
+        pattern = rf"def\s+{re.escape(name)}\s*\(\s*\)" if no_parameters else rf"def\s+{re.escape(name)}\s*\("
+        lines[lineno - 1] = re.sub(pattern, replacement, lines[lineno - 1], count=1)
+    # Decorators add lines, so they go in last and bottom-up.
+    for lineno, markers in sorted(decorators, reverse=True):
+        lines[lineno - 1:lineno - 1] = markers
+    return "\n".join(lines)
+
+
+def walk_body(function):
+    # ast.walk over a function's statements, leaving out its decorators and parameter defaults.
+    for statement in function.body:
+        yield from ast.walk(statement)
+
+
+def is_base_url(node):
+    # BASE_URL, the base_url fixture or a session's .base_url.
+    return (isinstance(node, ast.Name) and node.id.lower() == "base_url"
+            or isinstance(node, ast.Attribute) and node.attr == "base_url")
+
+
+def infer_operation(function):
+    # ("POST", "/login") from the first request the test sends, when its URL can be read statically.
+    assignments = {
+        target.id: statement.value
+        for statement in walk_body(function) if isinstance(statement, ast.Assign)
+        for target in statement.targets if isinstance(target, ast.Name)
+    }
+
+    for call in walk_body(function):
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                and isinstance(call.func.value, ast.Name) and call.func.value.id in (SESSION_FIXTURE, "requests")
+                and call.func.attr in HTTP_VERBS):
+            continue
+
+        arguments = list(call.args) + [keyword.value for keyword in call.keywords if keyword.arg in ("method", "url")]
+        if call.func.attr == "request":
+            if len(arguments) < 2 or not isinstance(arguments[0], ast.Constant):
+                return None
+            method, url = str(arguments[0].value).upper(), arguments[1]
+        elif arguments:
+            method, url = call.func.attr.upper(), arguments[0]
+        else:
+            return None
+
+        if isinstance(url, ast.Name):
+            url = assignments.get(url.id)
+        if isinstance(url, ast.Constant) and isinstance(url.value, str):
+            path = url.value
+        elif isinstance(url, ast.JoinedStr):
+            # f"{BASE_URL}/login" is /login; any other leading value leaves the path unknown.
+            values = url.values
+            if values and isinstance(values[0], ast.FormattedValue) and is_base_url(values[0].value):
+                values = values[1:]
+            path = "".join(value.value if isinstance(value, ast.Constant) else "{}" for value in values)
+        else:
+            return None
+
+        path = LOCAL_ORIGIN_RE.sub("", path).split("?", 1)[0]
+        if "://" in path or path.startswith("{}"):
+            return None
+        return method, "/" + path.lstrip("/")
+    return None
+
+
+def write_conftest(directory, isolated=False):
+    content = CONFTEST_TEMPLATE + (ISOLATED_FIXTURES if isolated else SHARED_SESSION_FIXTURE)
+    if isolated:
+        content = content.replace("import os\n", "import os\nimport uuid\nimport zlib\n", 1)
+
+    conftest = directory / "conftest.py"
+    if not conftest.exists() or conftest.read_text() != content:
+        conftest.write_text(content)
+
+
+def assemble_test_file(sections, header="", api_name=None, isolated=False):
+    # Imports are hoisted out of every section (and the previous file's header, for reused
+    # sections), deduplicated and pruned to the names the file actually uses.
+    imports = {statement: ast.parse(statement).body[0] for statement in ("import os", "import pytest")}
+    bodies = []
+    defined = set()
+
+    for node in single_imports(split_imports(header)[0] if header else []):
+        imports.setdefault(ast.unparse(node), node)
+
+    for section in sections:
+        try:
+            section_imports, body = split_imports(section)
+            body = use_session_fixture(rename_collisions(body, defined))
+            if isolated:
+                body = isolate_test_data(body, api_name)
+        except SyntaxError:
+            bodies.append(section)
+            continue
+        for node in single_imports(section_imports):
+            imports.setdefault(ast.unparse(node), node)
+        # Hoisting leaves a gap between the scenario marker and the code; close it.
+        bodies.append(re.sub(rf"^({re.escape(SCENARIO_MARKER)}.*)\n\s*\n", r"\1\n", body))
+
+    used = set()
+    for body in [BASE_URL_LINE, *bodies]:
+        try:
+            used.update(node.id for node in ast.walk(ast.parse(body)) if isinstance(node, ast.Name))
+        except SyntaxError:
+            continue
+
+    import_lines = sorted(
+        (statement for statement, node in imports.items()
+         if any(name == "*" or name in used for name in imported_names(node))),
+        key=lambda statement: (statement.startswith("from "), statement)
+    )
+    return "\n\n".join(["\n".join(import_lines), BASE_URL_LINE, *bodies]).lstrip() + "\n"
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+class ResponseCache:
+    # Single-file SQLite store of LLM responses, keyed by a hash of the request.
+    # Least recently used entries are evicted once the stored size exceeds max_bytes.
+
+    def __init__(self, path, max_bytes):
+        # Worker processes share the file; the timeout makes a writer wait for another's lock.
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    @staticmethod
+    def key(model, messages, temperature, max_tokens):
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self.conn:
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, encoded, len(encoded.encode("utf-8")), time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self.conn.close()
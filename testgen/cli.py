@@ -0,0 +1,139 @@
+import argparse
+import re
+from pathlib import Path
+
+from .config import (DEFAULT_APIS_DIR, DEFAULT_BATCH_SIZE, DEFAULT_CACHE_MAX_MB, DEFAULT_CACHE_PATH, DEFAULT_DEDUP_THRESHOLD,
+                     DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_REPAIRS, DEFAULT_MAX_RETRIES, DEFAULT_OUTPUT_DIR, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_SPEC_CACHE_DIR,
+                     DEFAULT_TOKENS_PER_MINUTE, DEFAULT_WORKERS)
+from .pipeline import Options, discover_apis, generate, select_shard
+from .reporting import log
+from .sections import parse_scenarios
+from .loader import load_spec
+
+SHARD_RE = re.compile(r"^(\d+)/(\d+)$")
+
+
+def list_apis(api_dirs, spec_cache_dir=None):
+    # Parses every selected spec without touching the model, so broken inputs show up early.
+    if not api_dirs:
+        log("⚠️  No API directories selected")
+    ok = True
+    for api_dir in api_dirs:
+        try:
+            spec_index = load_spec(api_dir / "swagger.yaml", spec_cache_dir)
+            if not isinstance(spec_index.spec, dict):
+                raise ValueError("swagger.yaml is not a valid YAML mapping")
+            (api_dir / "requirements.txt").stat()
+        except Exception as e:
+            log(f"❌ {api_dir}: {e}")
+            ok = False
+            continue
+        scenarios_file = api_dir / "scenarios.txt"
+        scenarios = len(parse_scenarios(scenarios_file.read_text())) if scenarios_file.exists() else "no"
+        files = f" in {1 + len(spec_index.sources)} files" if spec_index.sources else ""
+        log(f"📄 {api_dir}: {len(spec_index.operations)} operations{files}, {scenarios} scenarios")
+    return ok
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="testgen", description="Generate pytest API tests from requirements and swagger specs.")
+    parser.add_argument("--apis", nargs="+", metavar="GLOB",
+                        help=f"API directories to process, as paths or glob patterns (default: every directory in {DEFAULT_APIS_DIR}/)")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help="Directory the tests/<api>/ folders are written to (default: %(default)s)")
+    parser.add_argument("--manifest", type=Path,
+                        help="Manifest file (default: .testgen-manifest.json next to the API directories)")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="Only process shard I of N (1-based) of the selected APIs, e.g. one per CI node")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes the APIs are spread over; concurrency and rate limits are split "
+                             "between them (default: %(default)s)")
+    parser.add_argument("--list", action="store_true",
+                        help="List and check the selected APIs without generating anything")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Maximum number of in-flight LLM requests across all APIs (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the response cache: always call the model and store nothing")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Fill the response cache without writing scenarios.txt or test files")
+    parser.add_argument("--cache-path", type=Path, default=DEFAULT_CACHE_PATH,
+                        help="SQLite file used for the response cache (default: %(default)s)")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_MB,
+                        help="Size cap of the response cache before LRU eviction (default: %(default)s)")
+    parser.add_argument("--spec-cache-dir", type=Path, default=DEFAULT_SPEC_CACHE_DIR,
+                        help="Directory of parsed specs reused while the spec files are unchanged (default: %(default)s)")
+    parser.add_argument("--no-spec-cache", action="store_true",
+                        help="Parse every spec from scratch and store nothing")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Scenarios sent per test-generation request; 1 disables batching (default: %(default)s)")
+    parser.add_argument("--requests-per-minute", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="Requests/min budget to pace against; learned from rate-limit headers when omitted")
+    parser.add_argument("--tokens-per-minute", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                        help="Tokens/min budget to pace against; learned from rate-limit headers when omitted")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Retries per request for 429s, timeouts and server errors (default: %(default)s)")
+    parser.add_argument("--isolated", action="store_true",
+                        help="Generate order-independent tests with unique data, cleanup fixtures and api/operation markers")
+    parser.add_argument("--no-synthesis", action="store_true",
+                        help="Do not derive tests from swagger.yaml; send every scenario to the model")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_DEDUP_THRESHOLD,
+                        help="Similarity (0-1] at which scenarios count as duplicates and only the first is kept "
+                             "(default: %(default)s)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep every scenario, even near-duplicates")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="Write generated tests without compiling and collecting them first")
+    parser.add_argument("--max-repairs", type=int, default=DEFAULT_MAX_REPAIRS,
+                        help="Repair prompts per test that fails to compile or collect (default: %(default)s)")
+    parser.add_argument("--report", type=Path,
+                        help="Write a JSON run report with time and tokens per stage, API and prompt kind")
+    parser.add_argument("--trace", type=Path,
+                        help="Write every stage span (OpenTelemetry-shaped) as JSON lines")
+    parser.add_argument("--otel", action="store_true",
+                        help="Also send the spans to OpenTelemetry (requires opentelemetry-api and a configured SDK)")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore the manifest and any interrupted run, and regenerate every API and scenario")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.no_cache and args.warm_cache:
+        parser.error("--no-cache and --warm-cache cannot be combined")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not 0 < args.dedup_threshold <= 1:
+        parser.error("--dedup-threshold must be greater than 0 and at most 1")
+
+    api_dirs = discover_apis(args.apis)
+    if args.shard:
+        match = SHARD_RE.match(args.shard)
+        if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+            parser.error("--shard must look like I/N with 1 <= I <= N")
+        api_dirs = select_shard(api_dirs, int(match.group(1)), int(match.group(2)))
+
+    if args.list:
+        raise SystemExit(0 if list_apis(api_dirs, None if args.no_spec_cache else args.spec_cache_dir) else 1)
+
+    options = Options(
+        max_concurrency=args.max_concurrency,
+        cache_path=None if args.no_cache else args.cache_path,
+        cache_max_mb=args.cache_max_mb,
+        warm_cache=args.warm_cache,
+        force=args.force,
+        batch_size=args.batch_size,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        max_retries=args.max_retries,
+        isolated=args.isolated,
+        synthesis=not args.no_synthesis,
+        otel=args.otel,
+        validate=not args.no_validate,
+        max_repairs=args.max_repairs,
+        spec_cache_dir=None if args.no_spec_cache else args.spec_cache_dir,
+        dedup_threshold=None if args.no_dedup else args.dedup_threshold
+    )
+    generate(api_dirs, args.output_dir, args.manifest, options, args.workers, args.report, args.trace)
@@ -0,0 +1,28 @@
+# Long-lived pytest collection worker used by validation.Validator. Reads one JSON request per
+# line on stdin ({"path": ...}), runs an in-process `pytest --collect-only` on that file and
+# answers with one JSON line ({"exit": <pytest exit code>, "output": ...}). Keeping pytest,
+# requests and the conftest imported between requests is what makes a check take milliseconds.
+import io
+import json
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+
+
+def main():
+    protocol = sys.stdout
+    for line in sys.stdin:
+        request = json.loads(line)
+        output = io.StringIO()
+        with redirect_stdout(output), redirect_stderr(output):
+            try:
+                exit_code = int(pytest.main(["--collect-only", "-q", "-p", "no:cacheprovider", request["path"]]))
+            except BaseException as e:
+                exit_code, output = -1, io.StringIO(f"{type(e).__name__}: {e}")
+        protocol.write(json.dumps({"exit": exit_code, "output": output.getvalue()}) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL = "gpt-4"
+# Bump whenever prompts or post-processing change so the manifest invalidates every generated file.
+GENERATOR_VERSION = "5"
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("TESTGEN_MAX_CONCURRENCY", "8"))
+DEFAULT_CACHE_PATH = Path(os.getenv("TESTGEN_CACHE_PATH", ".testgen-cache.sqlite"))
+DEFAULT_CACHE_MAX_MB = int(os.getenv("TESTGEN_CACHE_MAX_MB", "256"))
+DEFAULT_SPEC_CACHE_DIR = Path(os.getenv("TESTGEN_SPEC_CACHE_DIR", ".testgen-spec-cache"))
+DEFAULT_BATCH_SIZE = int(os.getenv("TESTGEN_BATCH_SIZE", "1"))
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("TESTGEN_REQUESTS_PER_MINUTE", "0")) or None
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("TESTGEN_TOKENS_PER_MINUTE", "0")) or None
+DEFAULT_MAX_RETRIES = int(os.getenv("TESTGEN_MAX_RETRIES", "8"))
+REQUEST_TIMEOUT = float(os.getenv("TESTGEN_REQUEST_TIMEOUT", "120"))
+CONTEXT_WINDOW = int(os.getenv("TESTGEN_CONTEXT_WINDOW", "8192"))
+TEST_MAX_TOKENS = 500
+DEFAULT_WORKERS = int(os.getenv("TESTGEN_WORKERS", "1"))
+DEFAULT_MAX_REPAIRS = int(os.getenv("TESTGEN_MAX_REPAIRS", "2"))
+DEFAULT_DEDUP_THRESHOLD = float(os.getenv("TESTGEN_DEDUP_THRESHOLD", "0.8"))
+
+# Default layout, relative to the working directory: one directory per API under apis/,
+# generated tests under tests/<api>/, and the manifest next to the APIs.
+DEFAULT_APIS_DIR = Path("apis")
+DEFAULT_OUTPUT_DIR = Path("tests")
+MANIFEST_NAME = ".testgen-manifest.json"
+
+SCENARIO_SYSTEM_PROMPT = "You are a QA analyst. Generate clear API test scenarios from the given software requirements."
+TEST_SYSTEM_PROMPT = "You are a helpful assistant that writes Python test functions using pytest and requests."
+BATCH_SYSTEM_PROMPT = "You are a helpful assistant that writes Python test functions using pytest and requests. You always answer with a single JSON object."
+
+ISOLATION_INSTRUCTIONS = (
+    " Take a `unique_id` pytest fixture argument (a short random string) and use it to make emails,"
+    " usernames and any other data the test creates unique. Create whatever data the test needs inside"
+    " the test itself and never rely on data created by other tests."
+)
@@ -0,0 +1,148 @@
+import math
+import re
+from collections import Counter, namedtuple
+
+from .sections import SCENARIO_NUMBER_RE
+from .spec import STOPWORDS, WORD_RE, keywords
+from .synthesis import NOT_HAPPY_WORDS, STATUS_CODE_RE
+
+# Scenario lines are compared on normalized words: filler dropped, plurals folded, and
+# words that mean the same outcome mapped onto one token, so "accepts valid credentials"
+# and "returns 200 OK when login is successful" both read as a successful login.
+FILLER_WORDS = STOPWORDS | {"all", "by", "check", "code", "correctly", "during", "ensure", "handle", "its", "must", "properly",
+                            "response", "respond", "return", "status", "system", "upon", "verify", "whether"}
+SYNONYMS = {
+    **dict.fromkeys(("accept", "accepted", "allow", "allowed", "created", "ok", "succeed", "success", "successful",
+                     "successfully", "valid"), "success"),
+    **dict.fromkeys(("deny", "denied", "error", "fail", "failed", "failure", "forbidden", "refuse", "refused", "reject",
+                     "rejected", "unauthorized"), "reject"),
+    **dict.fromkeys(("absent", "blank", "empty", "missing", "omit", "omitted", "without"), "missing"),
+    **dict.fromkeys(("bad", "incorrect", "invalid", "malformed", "wrong"), "invalid")
+}
+NEGATIVE_WORDS = NOT_HAPPY_WORDS | {"reject", "missing", "invalid"}
+# "the email field", "email and password fields": fields named in the scenario even when the
+# spec does not define them.
+NAMED_FIELD_RE = re.compile(r"\b([a-z0-9_]+)(?:,? (?:and|or) ([a-z0-9_]+))? fields?\b")
+
+Merge = namedtuple("Merge", ["kept", "duplicate", "similarity"])
+
+
+def stem(word):
+    # Just enough to fold "fields"/"field" and "registering"/"registered"/"register".
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    for suffix in ("ing", "ed"):
+        if len(word) > len(suffix) + 4 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize(scenario):
+    # Returns the scenario's normalized tokens, with status codes folded into success/reject
+    # (non-2xx codes are kept as well, since "401" and "409" are different cases).
+    tokens = set()
+    for word in WORD_RE.findall(scenario.lower()):
+        if STATUS_CODE_RE.fullmatch(word):
+            tokens.add("success" if word.startswith("2") else "reject")
+            if not word.startswith("2"):
+                tokens.add(word)
+            continue
+        word = SYNONYMS.get(stem(word), SYNONYMS.get(word, stem(word)))
+        if word not in FILLER_WORDS:
+            tokens.add(word)
+    return tokens
+
+
+def spec_fields(spec_index):
+    # Request body properties and parameter names of every operation.
+    fields = set()
+    for _, _, operation, _ in spec_index.operations:
+        for parameter in operation.get("parameters") or []:
+            name = spec_index.resolve(parameter).get("name")
+            if isinstance(name, str):
+                fields.add(name)
+        body = spec_index.resolve(operation.get("requestBody") or {})
+        for media in (body.get("content") or {}).values():
+            schema = spec_index.resolve(media.get("schema") or {}) if isinstance(media, dict) else {}
+            fields.update(name for name in (schema.get("properties") or {}) if isinstance(name, str))
+    return {field for field in fields if keywords(field)}
+
+
+class ScenarioProfile:
+    # What a scenario is about, for deciding whether two of them can be the same case: its
+    # tokens, the spec fields, numbers and operations it names, and whether it expects the
+    # request to succeed or to be rejected.
+
+    def __init__(self, scenario, spec_index=None, fields=()):
+        scenario = SCENARIO_NUMBER_RE.sub("", scenario.strip())
+        words = keywords(scenario)
+        self.text = " ".join(WORD_RE.findall(scenario.lower()))
+        self.tokens = normalize(scenario)
+        self.numbers = {word for word in words if word.isdigit()}
+        self.fields = {field for field in fields if keywords(field) <= words}
+        for match in NAMED_FIELD_RE.finditer(self.text):
+            self.fields.update(name for name in match.groups() if name and name not in FILLER_WORDS)
+        self.operations = {(path, method) for path, method, _, _ in spec_index.match(scenario)} if spec_index else set()
+        negative = bool(words & NEGATIVE_WORDS or self.tokens & NEGATIVE_WORDS
+                        or any(not number.startswith("2") for number in self.numbers if STATUS_CODE_RE.fullmatch(number)))
+        self.intent = "negative" if negative else "positive" if "success" in self.tokens else None
+        if self.intent == "positive":
+            # A successful request sends every field, so naming some of them does not make
+            # it a different case.
+            self.tokens -= {word for field in self.fields for word in keywords(field)}
+
+    def compatible(self, other):
+        # Scenarios that expect different outcomes, or name different numbers or operations, are
+        # never merged however similar the rest of the wording is; neither are failure cases
+        # about different fields ("empty email" and "empty password" are two tests).
+        if self.intent != other.intent:
+            return False
+        for mine, theirs in ((self.numbers, other.numbers), (self.operations, other.operations)):
+            if mine and theirs and mine != theirs:
+                return False
+        return self.intent == "positive" or self.fields == other.fields
+
+
+def tfidf_vectors(token_sets):
+    # Unit-length TF-IDF vectors (binary term frequency, smoothed IDF over these scenarios).
+    frequency = Counter(token for tokens in token_sets for token in tokens)
+    vectors = []
+    for tokens in token_sets:
+        vector = {token: math.log((1 + len(token_sets)) / (1 + frequency[token])) + 1 for token in tokens}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({token: weight / norm for token, weight in vector.items()})
+    return vectors
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(token, 0.0) for token, weight in a.items())
+
+
+def deduplicate_scenarios(scenarios, threshold, spec_index=None):
+    # Clusters near-duplicate scenarios and keeps the first one of each cluster. Each scenario
+    # is compared with the scenarios kept so far and merged into the most similar one when the
+    # cosine similarity of their TF-IDF vectors reaches threshold. Returns the kept scenarios
+    # in their original order and a Merge for every dropped one.
+    fields = spec_fields(spec_index) if spec_index is not None else set()
+    profiles = [ScenarioProfile(scenario, spec_index, fields) for scenario in scenarios]
+    vectors = tfidf_vectors([profile.tokens for profile in profiles])
+
+    kept, merges = [], []
+    for index, profile in enumerate(profiles):
+        best, best_score = None, 0.0
+        for candidate in kept:
+            if profiles[candidate].text == profile.text:
+                best, best_score = candidate, 1.0
+                break
+            if not profile.compatible(profiles[candidate]):
+                continue
+            score = cosine(vectors[index], vectors[candidate])
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= threshold:
+            merges.append(Merge(scenarios[best], scenarios[index], round(best_score, 3)))
+        else:
+            kept.append(index)
+    return [scenarios[index] for index in kept], merges
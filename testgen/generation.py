@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+from .assemble import extract_code
+from .config import (BATCH_SYSTEM_PROMPT, CONTEXT_WINDOW, SCENARIO_SYSTEM_PROMPT, TEST_MAX_TOKENS,
+                     TEST_SYSTEM_PROMPT)
+from .reporting import log
+from .sections import SCENARIO_MARKER, parse_scenarios
+from .spec import estimate_tokens
+
+# ------------------------
+# Step 1: Generate scenarios
+# ------------------------
+async def generate_scenarios(llm, requirements):
+    scenario_response = await llm.complete(
+        messages=[
+            {"role": "system", "content": SCENARIO_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Based on the following API requirements, list concise test scenarios:\n\n{requirements}\n\nEach scenario should be one line only."}
+        ],
+        temperature=0.3,
+        max_tokens=500,
+        prompt="scenarios"
+    )
+    return parse_scenarios(scenario_response.content)
+
+
+# ------------------------
+# Step 2: Generate pytest test code
+# ------------------------
+async def generate_test(llm, spec_index, scenario, stats, instructions=""):
+    spec_text = spec_index.slice_for([scenario])
+    stats["spec_tokens_full"] += estimate_tokens(spec_index.text)
+    stats["spec_tokens_sent"] += estimate_tokens(spec_text)
+
+    prompt = (
+        f"Given the following OpenAPI spec:\n{spec_text}\n\n"
+        f"And this test scenario:\n{scenario}\n\n"
+        "Write a Python pytest test function using the requests library. Only include valid Python code."
+        f"{instructions}"
+    )
+
+    try:
+        response = await llm.complete(
+            messages=[
+                {"role": "system", "content": TEST_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=TEST_MAX_TOKENS,
+            prompt="test"
+        )
+    except Exception as e:
+        log(f"❌ Error generating test for scenario: {scenario}\n  ➤ {e}")
+        return f"{SCENARIO_MARKER}{scenario}\n# Error generating test for scenario: {scenario}\n# {e}", False
+
+    with llm.tracer.span("postprocess.extract"):
+        code = extract_code(response.content)
+    if code is None:
+        log(f"❌ No valid Python in the response for scenario: {scenario}")
+        return f"{SCENARIO_MARKER}{scenario}\n# No valid Python generated for scenario: {scenario}", False
+    return f"{SCENARIO_MARKER}{scenario}\n{code}", True
+
+
+def parse_batch_response(response, count):
+    # Returns {scenario index: code} for every well-formed entry; a truncated or
+    # malformed response yields nothing so the caller can split and retry.
+    if response.finish_reason == "length":
+        return {}
+
+    content = response.content or ""
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end < start:
+        return {}
+    try:
+        payload = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    codes = {}
+    entries = payload.get("tests") if isinstance(payload, dict) else None
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        number, code = entry.get("scenario"), entry.get("code")
+        if isinstance(number, int) and 1 <= number <= count and isinstance(code, str) and code.strip():
+            codes[number - 1] = code
+    return codes
+
+
+async def generate_test_batch(llm, spec_index, scenarios, stats, instructions=""):
+    # Sends several scenarios in one request and asks for one function per scenario as JSON.
+    # Scenarios missing from the answer are retried on their own; a batch that fails
+    # outright is split in half until it comes down to the single-scenario prompt.
+    if len(scenarios) == 1:
+        return [await generate_test(llm, spec_index, scenarios[0], stats, instructions)]
+
+    spec_text = spec_index.slice_for(scenarios)
+    numbered = "\n".join(f"{number}. {scenario}" for number, scenario in enumerate(scenarios, 1))
+    prompt = (
+        f"Given the following OpenAPI spec:\n{spec_text}\n\n"
+        f"And these test scenarios:\n{numbered}\n\n"
+        "Write one Python pytest test function using the requests library for each scenario. "
+        'Respond with JSON only, in the form {"tests": [{"scenario": <number>, "code": "<python code>"}]}, '
+        "with exactly one entry per scenario."
+        f"{instructions}"
+    )
+    max_tokens = TEST_MAX_TOKENS * len(scenarios)
+    if estimate_tokens(BATCH_SYSTEM_PROMPT + prompt) + max_tokens > CONTEXT_WINDOW:
+        return await split_batch(llm, spec_index, scenarios, stats, instructions)
+
+    # Slicing is measured per request as in generate_test; the spec copies the other scenarios
+    # would have needed in requests of their own are counted as batching savings instead.
+    stats["spec_tokens_full"] += estimate_tokens(spec_index.text)
+    stats["spec_tokens_sent"] += estimate_tokens(spec_text)
+    stats["spec_tokens_batched"] += estimate_tokens(spec_text) * (len(scenarios) - 1)
+
+    try:
+        response = await llm.complete(
+            messages=[
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=max_tokens,
+            prompt="test_batch"
+        )
+        with llm.tracer.span("postprocess.extract", scenarios=len(scenarios)):
+            codes = {
+                index: code
+                for index, code in ((index, extract_code(code)) for index, code in parse_batch_response(response, len(scenarios)).items())
+                if code is not None
+            }
+    except Exception as e:
+        log(f"⚠️  Batch of {len(scenarios)} scenarios failed, splitting it\n  ➤ {e}")
+        codes = {}
+
+    if not codes:
+        return await split_batch(llm, spec_index, scenarios, stats, instructions)
+
+    results = {
+        index: (f"{SCENARIO_MARKER}{scenarios[index]}\n{code}", True)
+        for index, code in codes.items()
+    }
+    missing = [index for index in range(len(scenarios)) if index not in codes]
+    if missing:
+        retried = await generate_test_batch(llm, spec_index, [scenarios[index] for index in missing], stats, instructions)
+        results.update(zip(missing, retried))
+    return [results[index] for index in range(len(scenarios))]
+
+
+async def split_batch(llm, spec_index, scenarios, stats, instructions=""):
+    middle = len(scenarios) // 2
+    first, second = await asyncio.gather(
+        generate_test_batch(llm, spec_index, scenarios[:middle], stats, instructions),
+        generate_test_batch(llm, spec_index, scenarios[middle:], stats, instructions)
+    )
+    return first + second
+
+
+# ------------------------
+# Step 3: Repair tests that fail validation
+# ------------------------
+async def repair_test(llm, scenario, code, error, instructions=""):
+    # Returns the corrected code, or None when the answer holds no usable Python.
+    prompt = (
+        f"This pytest test function for the scenario:\n{scenario}\n\n"
+        f"```python\n{code}\n```\n\n"
+        f"fails before it can run, with this error:\n{error}\n\n"
+        "Fix the error and return the whole corrected test function. Only include valid Python code."
+        f"{instructions}"
+    )
+    response = await llm.complete(
+        messages=[
+            {"role": "system", "content": TEST_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        max_tokens=TEST_MAX_TOKENS,
+        prompt="repair"
+    )
+    return extract_code(response.content)
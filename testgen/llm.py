@@ -0,0 +1,272 @@
+# Everything that talks to OpenAI. Imported lazily by the pipeline, so listing APIs or
+# importing the package never imports or configures the openai client.
+import asyncio
+import json
+import random
+import re
+import time
+from collections import namedtuple
+
+import openai
+
+from .cache import ResponseCache
+from .config import DEFAULT_MAX_RETRIES, MODEL
+from .reporting import CURRENT_SPAN, Tracer, log, span_add, span_set
+from .spec import estimate_tokens
+
+# usage is {"prompt_tokens", "completion_tokens"} as reported by the API, when it reports it.
+Completion = namedtuple("Completion", ["content", "finish_reason", "usage"], defaults=[None])
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 60.0
+# Every successful request earns this fraction of a retry; it keeps a struggling run from
+# turning into a retry storm while still letting occasional failures be retried.
+RETRY_BUDGET_RATIO = 0.2
+INITIAL_RETRY_BUDGET = 20
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+
+def parse_duration(value):
+    # Rate-limit reset headers look like "1s", "6m0s" or "20ms".
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(amount) * units[unit] for amount, unit in DURATION_RE.findall(value or ""))
+
+
+def header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    # Continuously refilling budget of `per_minute` units; None means unlimited. `share` scales
+    # limits learned from the server when the budget is split between processes.
+
+    def __init__(self, per_minute=None, share=1.0):
+        self.share = share
+        self.capacity = per_minute
+        self.level = per_minute or 0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        if not self.capacity:
+            return 0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0 if self.level >= amount else (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount):
+        if self.capacity:
+            self._refill()
+            self.level -= amount
+
+    def sync(self, limit, remaining):
+        # The server's view of the budget wins over our estimate.
+        limit = max(1, int(limit * self.share)) if limit else limit
+        remaining = int(remaining * self.share) if remaining is not None else None
+        if limit:
+            if not self.capacity:
+                self.level = limit
+                self.updated = time.monotonic()
+            self.capacity = limit
+        if remaining is not None and self.capacity:
+            self._refill()
+            self.level = min(self.level, remaining)
+
+
+class Scheduler:
+    # Paces requests against the org's requests/min and tokens/min budgets (learned from the
+    # x-ratelimit-* response headers when not configured), retries retryable failures with
+    # jittered exponential backoff, and adapts concurrency: halved on a 429, raised by one after
+    # a window of successes, never above max_concurrency.
+
+    def __init__(self, max_concurrency, requests_per_minute=None, tokens_per_minute=None, max_retries=DEFAULT_MAX_RETRIES,
+                 share=1.0):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.requests = TokenBucket(requests_per_minute, share)
+        self.tokens = TokenBucket(tokens_per_minute, share)
+        self.paused_until = 0.0
+        self.cooldown_until = 0.0
+        self.successes = 0
+        self.max_retries = max_retries
+        self.retry_budget = INITIAL_RETRY_BUDGET
+        self.retries = 0
+        self.rate_limited = 0
+
+    async def run(self, request, cost):
+        # `request` is an async callable returning (result, response headers); `cost` is the
+        # estimated tokens the request counts against the tokens/min budget.
+        attempt = 0
+        while True:
+            waited = time.monotonic()
+            await self._acquire(cost)
+            span_add("queue_ms", round((time.monotonic() - waited) * 1000, 3))
+            try:
+                result, headers = await request()
+            except RETRYABLE_ERRORS as e:
+                await self._release(success=False)
+                response = getattr(e, "response", None)
+                headers = response.headers if response is not None else {}
+                self._observe(headers)
+
+                if attempt >= self.max_retries or self.retry_budget < 1:
+                    raise
+                attempt += 1
+                self.retries += 1
+                self.retry_budget -= 1
+                span_add("retries", 1)
+
+                delay = self._backoff(attempt, headers)
+                if isinstance(e, openai.RateLimitError):
+                    await self._on_rate_limited(delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await self._release(success=False)
+                raise
+
+            self._observe(headers)
+            await self._release(success=True)
+            return result
+
+    async def _acquire(self, cost):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+        # Waiting and taking happen without an await in between, so the budget cannot be
+        # claimed twice.
+        while True:
+            delay = max(self.paused_until - time.monotonic(), self.requests.wait_time(1), self.tokens.wait_time(cost))
+            if delay <= 0:
+                self.requests.take(1)
+                self.tokens.take(cost)
+                return
+            await asyncio.sleep(delay)
+
+    async def _release(self, success):
+        async with self.condition:
+            self.in_flight -= 1
+            if success:
+                self.retry_budget += RETRY_BUDGET_RATIO
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self.successes = 0
+            self.condition.notify_all()
+
+    async def _on_rate_limited(self, delay):
+        self.rate_limited += 1
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + delay)
+        # Only back off once per cooldown; the other requests that hit the same wall
+        # should not halve the limit again. The cooldown is kept apart from paused_until,
+        # which the 429's own x-ratelimit-* headers have usually pushed forward already.
+        if now >= self.cooldown_until:
+            async with self.condition:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+            self.cooldown_until = self.paused_until
+            log(f"🐢 Rate limited, pausing {self.paused_until - now:.1f}s and lowering concurrency to {self.limit}")
+
+    def _backoff(self, attempt, headers):
+        delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        retry_after_ms = header_int(headers, "retry-after-ms")
+        retry_after = retry_after_ms / 1000 if retry_after_ms is not None else header_int(headers, "retry-after")
+        return max(delay, retry_after or 0)
+
+    def _observe(self, headers):
+        if not headers:
+            return
+        self.requests.sync(header_int(headers, "x-ratelimit-limit-requests"), header_int(headers, "x-ratelimit-remaining-requests"))
+        self.tokens.sync(header_int(headers, "x-ratelimit-limit-tokens"), header_int(headers, "x-ratelimit-remaining-tokens"))
+
+        # An exhausted budget pauses everyone until the server says it resets.
+        for kind in ("requests", "tokens"):
+            if header_int(headers, f"x-ratelimit-remaining-{kind}") == 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+
+class LLM:
+    # Wraps AsyncOpenAI so every call across all APIs goes through the shared scheduler
+    # and, when a cache is given, is answered from disk whenever the exact request was seen before.
+    # Completions are streamed so progress can report tokens as they arrive.
+
+    def __init__(self, client, scheduler, cache=None, progress=None, tracer=None):
+        self.client = client
+        self.scheduler = scheduler
+        self.cache = cache
+        self.progress = progress
+        self.tracer = tracer or Tracer()
+
+    async def complete(self, messages, temperature, max_tokens, prompt="completion"):
+        # `prompt` names the kind of prompt in the run report.
+        with self.tracer.span("llm.call", prompt=prompt, api=self._api(), cache_hit=False, retries=0) as span:
+            completion = await self._complete(messages, temperature, max_tokens)
+            span.attributes["finish_reason"] = completion.finish_reason
+            if completion.usage and not span.attributes["cache_hit"]:
+                span.attributes.update(completion.usage)
+            return completion
+
+    @staticmethod
+    def _api():
+        span = CURRENT_SPAN.get()
+        while span is not None and "api" not in span.attributes:
+            span = span.parent
+        return span.attributes["api"] if span is not None else None
+
+    async def _complete(self, messages, temperature, max_tokens):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key(MODEL, messages, temperature, max_tokens)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                span_set(cache_hit=True)
+                return Completion(cached["content"], cached.get("finish_reason", "stop"), cached.get("usage"))
+
+        async def request():
+            raw = await self.client.chat.completions.with_raw_response.create(
+                model=MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            parts = []
+            finish_reason = None
+            usage = None
+            async with raw.parse() as stream:
+                async for chunk in stream:
+                    # With include_usage the last chunk has no choices, only the token counts.
+                    if chunk.usage is not None:
+                        usage = {"prompt_tokens": chunk.usage.prompt_tokens, "completion_tokens": chunk.usage.completion_tokens}
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        if self.progress is not None:
+                            # Each streamed chunk carries about one token.
+                            self.progress.add_tokens(1)
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+            return Completion("".join(parts), finish_reason, usage), raw.headers
+
+        cost = estimate_tokens(json.dumps(messages)) + max_tokens
+        completion = await self.scheduler.run(request, cost)
+
+        if self.cache is not None:
+            self.cache.put(cache_key, completion._asdict())
+        return completion
@@ -0,0 +1,201 @@
+import copy
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from .reporting import log
+from .sections import fingerprint
+from .spec import YAML_DUMPER, YAML_LOADER, SpecIndex
+
+# Bump whenever SpecIndex or the bundling changes shape, so stale pickles are ignored.
+SPEC_CACHE_VERSION = "1"
+COMPONENT_SECTIONS = ("schemas", "responses", "parameters", "examples", "requestBodies", "headers",
+                      "securitySchemes", "links", "callbacks", "pathItems")
+SWAGGER2_SECTIONS = ("definitions", "parameters", "responses")
+# Component section a $ref found under these keys points into, for refs whose pointer does not
+# name one (e.g. "params.yaml#/id" in a parameters list).
+KEY_SECTIONS = {"parameters": "parameters", "responses": "responses", "requestBody": "requestBodies",
+                "headers": "headers", "examples": "examples", "links": "links", "callbacks": "callbacks"}
+SCHEMA_KEYS = {"schema", "items", "additionalProperties", "not"}
+SCHEMA_LIST_KEYS = {"properties", "allOf", "anyOf", "oneOf"}
+
+
+def file_digest(path):
+    # Missing files get a digest too, so a ref that was broken is retried once the file appears.
+    try:
+        return fingerprint(Path(path).read_text())
+    except OSError:
+        return "missing"
+
+
+def escape_pointer(part):
+    return str(part).replace("~", "~0").replace("/", "~1")
+
+
+def pointer_parts(pointer):
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer.lstrip("/").split("/")] if pointer.strip("/") else []
+
+
+class SpecBundler:
+    # Inlines external $refs ("common.yaml#/components/schemas/User", "../shared/user.yaml")
+    # into the root document, under components (definitions for Swagger 2), and rewrites them
+    # as local refs, so the rest of the pipeline only ever sees one self-contained spec.
+    # Refs inside the referenced files are followed the same way, relative to their own file.
+
+    def __init__(self, root_file, root):
+        self.root_file = Path(root_file).resolve()
+        self.root = root
+        self.swagger2 = "swagger" in root
+        self.documents = {self.root_file: root}
+        self.sources = {}
+        self.imported = {}
+        # Nodes copied in from other files are already rewritten relative to their own file
+        # and must not be walked again as if they belonged to the root.
+        self.bundled = set()
+
+    def bundle(self):
+        self._rewrite(self.root, self.root_file, "schemas")
+        return self.root
+
+    def _rewrite(self, node, base, section, parent_key=None):
+        if id(node) in self.bundled:
+            return
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                local = self._local_ref(ref, base, section)
+                if local is not None:
+                    node["$ref"] = local
+            for key, value in list(node.items()):
+                self._rewrite(value, base, self._section_for(key, parent_key, section), key)
+        elif isinstance(node, list):
+            for value in node:
+                self._rewrite(value, base, section, parent_key)
+
+    @staticmethod
+    def _section_for(key, parent_key, section):
+        if parent_key in SCHEMA_LIST_KEYS or key in SCHEMA_KEYS:
+            return "schemas"
+        return KEY_SECTIONS.get(key, section)
+
+    def _local_ref(self, ref, base, section="schemas"):
+        # Returns the local ref that replaces `ref`, or None to leave it as it is.
+        if "://" in ref:
+            return None
+        file_part, _, pointer = ref.partition("#")
+        target_file = (base.parent / file_part).resolve() if file_part else base
+        if target_file == self.root_file:
+            return None if not file_part else f"#{pointer}"
+
+        key = (target_file, pointer)
+        if key in self.imported:
+            return self.imported[key]
+
+        document = self._document(target_file)
+        if document is None:
+            return None
+        try:
+            node = document
+            for part in pointer_parts(pointer):
+                node = node[int(part) if isinstance(node, list) else part]
+        except (KeyError, IndexError, TypeError, ValueError):
+            log(f"⚠️  Unresolvable $ref {ref!r} in {base}")
+            return None
+
+        location, name = self._placement(target_file, pointer, section)
+        container = self.root
+        for part in location:
+            container = container.setdefault(part, {})
+        unique, number = name, 1
+        while unique in container:
+            number += 1
+            unique = f"{name}_{number}"
+
+        # The name and the ref are claimed before the copy is rewritten, so refs nested in it
+        # (including cyclic ones) neither take the same name nor import it twice.
+        local = "#/" + "/".join(escape_pointer(part) for part in [*location, unique])
+        self.imported[key] = local
+        container[unique] = None
+        node = copy.deepcopy(node)
+        self._rewrite(node, target_file, self._section_for(None, None, section))
+        container[unique] = node
+        self.bundled.add(id(node))
+        return local
+
+    def _placement(self, target_file, pointer, section):
+        parts = pointer_parts(pointer)
+        name = parts[-1] if parts else target_file.stem
+        if self.swagger2:
+            if len(parts) == 2 and parts[0] in SWAGGER2_SECTIONS:
+                return [parts[0]], parts[1]
+            return [section if section in SWAGGER2_SECTIONS else "definitions"], name
+        if len(parts) == 3 and parts[0] == "components" and parts[1] in COMPONENT_SECTIONS:
+            return ["components", parts[1]], parts[2]
+        return ["components", section], name
+
+    def _document(self, path):
+        if path not in self.documents:
+            self.sources[str(path)] = file_digest(path)
+            try:
+                self.documents[path] = yaml.load(path.read_text(), Loader=YAML_LOADER)
+            except (OSError, yaml.YAMLError) as e:
+                log(f"⚠️  Cannot load referenced spec file {path}: {e}")
+                self.documents[path] = None
+        return self.documents[path]
+
+
+def parse_spec(swagger_file):
+    # Parses and bundles swagger_file. Specs without external refs keep their original text,
+    # so prompts and fingerprints are unchanged for them.
+    swagger_file = Path(swagger_file)
+    text = swagger_file.read_text()
+    try:
+        spec = yaml.load(text, Loader=YAML_LOADER)
+    except yaml.YAMLError:
+        return SpecIndex(text)
+    if not isinstance(spec, dict):
+        return SpecIndex(text, spec)
+
+    bundler = SpecBundler(swagger_file, spec)
+    bundled = bundler.bundle()
+    if bundler.sources:
+        text = yaml.dump(bundled, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True)
+    return SpecIndex(text, bundled, bundler.sources)
+
+
+def load_spec(swagger_file, cache_dir=None):
+    # Like parse_spec, but with cache_dir the SpecIndex is pickled there (one file per spec
+    # path) and reused while the spec and every file it references hash the same, so later
+    # runs and worker processes skip parsing. The pickles are only ever written by this
+    # function; delete the directory to drop them.
+    swagger_file = Path(swagger_file)
+    if not cache_dir:
+        return parse_spec(swagger_file)
+
+    cache_file = Path(cache_dir) / f"{fingerprint(str(swagger_file.resolve()))[:32]}.pickle"
+    root_hash = fingerprint(swagger_file.read_text())
+    try:
+        with open(cache_file, "rb") as f:
+            version, cached_root, spec_index = pickle.load(f)
+        if version == SPEC_CACHE_VERSION and cached_root == root_hash and all(
+            file_digest(path) == digest for path, digest in spec_index.sources.items()
+        ):
+            return spec_index
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError, TypeError):
+        pass
+
+    spec_index = parse_spec(swagger_file)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Written to a temporary file and renamed, so concurrent workers never read half a pickle.
+    descriptor, staged = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            pickle.dump((SPEC_CACHE_VERSION, root_hash, spec_index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staged, cache_file)
+    except OSError as e:
+        log(f"⚠️  Cannot write the spec cache {cache_file}: {e}")
+        Path(staged).unlink(missing_ok=True)
+    return spec_index
@@ -0,0 +1,382 @@
+import asyncio
+import glob
+import json
+import os
+import zlib
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .assemble import assemble_test_file, write_conftest
+from .cache import ResponseCache
+from .config import (DEFAULT_APIS_DIR, DEFAULT_BATCH_SIZE, DEFAULT_CACHE_MAX_MB, DEFAULT_CACHE_PATH, DEFAULT_DEDUP_THRESHOLD,
+                     DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_REPAIRS, DEFAULT_MAX_RETRIES, DEFAULT_OUTPUT_DIR, DEFAULT_REQUESTS_PER_MINUTE,
+                     DEFAULT_SPEC_CACHE_DIR, DEFAULT_TOKENS_PER_MINUTE,
+                     GENERATOR_VERSION, ISOLATION_INSTRUCTIONS, MANIFEST_NAME, REQUEST_TIMEOUT)
+from .dedup import deduplicate_scenarios
+from .generation import generate_scenarios, generate_test_batch, repair_test
+from .reporting import Progress, Tracer, log
+from .sections import (SCENARIO_MARKER, PartialTestFile, fingerprint, load_manifest, parse_scenarios, read_sections,
+                       save_manifest, scenario_fingerprint)
+from .loader import load_spec
+from .synthesis import covered_by_synthesis, synthesize_tests
+from .validation import CollectorPool, Validator, error_summary
+
+# Settings of a generation run, defaulting to the CLI defaults. cache_path=None disables the
+# response cache, spec_cache_dir=None the parsed-spec cache and dedup_threshold=None the
+# scenario deduplication.
+Options = namedtuple("Options", [
+    "max_concurrency", "cache_path", "cache_max_mb", "warm_cache", "force", "batch_size",
+    "requests_per_minute", "tokens_per_minute", "max_retries", "isolated", "synthesis", "otel", "validate", "max_repairs",
+    "spec_cache_dir", "dedup_threshold"
+], defaults=[
+    DEFAULT_MAX_CONCURRENCY, DEFAULT_CACHE_PATH, DEFAULT_CACHE_MAX_MB, False, False, DEFAULT_BATCH_SIZE,
+    DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, DEFAULT_MAX_RETRIES, False, True, False, True, DEFAULT_MAX_REPAIRS,
+    DEFAULT_SPEC_CACHE_DIR, DEFAULT_DEDUP_THRESHOLD
+])
+
+
+def discover_apis(patterns=None, root=DEFAULT_APIS_DIR):
+    # Every directory under root, or the directories matching any of the glob patterns.
+    if not patterns:
+        return sorted(api_dir for api_dir in Path(root).iterdir() if api_dir.is_dir())
+    matches = {Path(match) for pattern in patterns for match in glob.glob(str(pattern))}
+    return sorted(api_dir for api_dir in matches if api_dir.is_dir())
+
+
+def select_shard(api_dirs, index, total):
+    # Shard i of n (1-based) by a hash of the API name, so an API stays on the same shard
+    # when others are added or removed.
+    return [api_dir for api_dir in api_dirs if zlib.crc32(api_dir.name.encode("utf-8")) % total == index - 1]
+
+
+async def validate_section(llm, validator, section, stats, max_repairs, instructions=""):
+    # Checks a generated section and, while it fails, asks the model to fix the reported error,
+    # at most max_repairs times. A section that never passes is written commented out and left
+    # out of the manifest, so the file still collects and the next run generates it again.
+    marker, _, code = section.partition("\n")
+    scenario = marker[len(SCENARIO_MARKER):]
+    for attempt in range(max_repairs + 1):
+        with llm.tracer.span("validate", attempt=attempt) as span:
+            error = await validator.check(f"{marker}\n{code}")
+            span.attributes["passed"] = error is None
+        if error is None:
+            if attempt:
+                stats["repaired"] += 1
+            return f"{marker}\n{code}", True
+        if attempt == max_repairs:
+            break
+
+        stats["repair_attempts"] += 1
+        try:
+            repaired = await repair_test(llm, scenario, code, error, instructions)
+        except Exception as e:
+            log(f"❌ Error repairing test for scenario: {scenario}\n  ➤ {e}")
+            break
+        if repaired is None:
+            break
+        code = repaired
+
+    stats["validation_failures"] += 1
+    log(f"❌ Generated test fails validation for scenario: {scenario}\n  ➤ {error_summary(error)}")
+    commented = "\n".join(f"# {line}".rstrip() for line in code.splitlines())
+    error_lines = "\n".join(f"#   {line}".rstrip() for line in error.splitlines())
+    return f"{marker}\n# Generated test failed validation:\n{error_lines}\n{commented}", False
+
+
+async def process_api(llm, api_dir, output_dir, manifest, stats, progress, batch_size=1, write_outputs=True, resume=True, isolated=False,
+                      synthesis=True, collectors=None, max_repairs=DEFAULT_MAX_REPAIRS, spec_cache_dir=None,
+                      dedup_threshold=DEFAULT_DEDUP_THRESHOLD):
+    # Regenerates only what changed since the manifest entry for this API was recorded:
+    # scenarios when requirements.txt changed, and tests for scenarios that are new or edited
+    # (or all of them when swagger.yaml changed). Everything else is copied from the existing file.
+    # Generated tests are checked in `collectors` (a CollectorPool) unless it is None.
+    tracer = llm.tracer
+    with tracer.span("api", api=api_dir.name):
+        swagger_file = api_dir / "swagger.yaml"
+        requirements_file = api_dir / "requirements.txt"
+        scenario_output_file = api_dir / "scenarios.txt"
+
+        output_test_file = Path(output_dir) / api_dir.name / f"test_{api_dir.name}_generated.py"
+        output_test_file.parent.mkdir(parents=True, exist_ok=True)
+        if write_outputs:
+            write_conftest(output_test_file.parent, isolated)
+
+        # Load inputs
+        with tracer.span("spec.load") as span:
+            spec_index = load_spec(swagger_file, spec_cache_dir)
+            requirements = requirements_file.read_text()
+            span.attributes.update(spec_bytes=spec_index.size, spec_files=1 + len(spec_index.sources),
+                                   operations=len(spec_index.operations))
+        swagger_hash = spec_index.fingerprint
+        requirements_hash = fingerprint(requirements)
+        previous = manifest.get(api_dir.name, {})
+        mode = "isolated" if isolated else "shared"
+        instructions = ISOLATION_INSTRUCTIONS if isolated else ""
+
+        fresh = previous.get("requirements") != requirements_hash or not scenario_output_file.exists()
+        if not fresh:
+            scenario_lines = parse_scenarios(scenario_output_file.read_text())
+        else:
+            try:
+                with tracer.span("scenarios"):
+                    scenario_lines = await generate_scenarios(llm, requirements)
+            except Exception as e:
+                log(f"❌ Error generating scenarios for {api_dir.name}: {e}")
+                return
+
+        # Near-duplicate scenarios would each cost a test-generation call for the same test.
+        # Fresh scenarios are written deduplicated, so the merges are only reported once.
+        if dedup_threshold:
+            with tracer.span("dedup", scenarios=len(scenario_lines)) as span:
+                scenario_lines, merges = deduplicate_scenarios(scenario_lines, dedup_threshold, spec_index)
+                span.attributes["merged"] = len(merges)
+            if merges:
+                stats["scenarios_merged"] += len(merges)
+                log(f"🔗 {api_dir.name}: merged {len(merges)} near-duplicate scenarios")
+                for merge in merges:
+                    log(f"  ➤ {merge.duplicate}\n    ≈ {merge.kept} (similarity {merge.similarity:.2f})")
+        if fresh and write_outputs:
+            scenario_output_file.write_text("\n".join(scenario_lines))
+            log(f"✅ Scenarios generated: {scenario_output_file}")
+
+        # Scenarios a spec-derived test already answers never reach the model.
+        with tracer.span("synthesis") as span:
+            synthesized = synthesize_tests(spec_index) if synthesis else []
+            covered = [scenario for scenario in scenario_lines if synthesized and covered_by_synthesis(spec_index, synthesized, scenario)]
+            scenario_lines = [scenario for scenario in scenario_lines if scenario not in covered]
+            span.attributes.update(tests=len(synthesized), scenarios_covered=len(covered))
+        if synthesized:
+            stats["synthesized_tests"] += len(synthesized)
+            stats["scenarios_covered"] += len(covered)
+            log(f"🧩 {api_dir.name}: {len(synthesized)} spec-derived tests, {len(covered)} scenarios covered without the LLM")
+
+        header, reusable = "", {}
+        # Isolated and shared tests are prompted differently, so switching modes regenerates them.
+        if previous.get("swagger") == swagger_hash and previous.get("mode", "shared") == mode:
+            header, sections = read_sections(output_test_file)
+            reusable = {key: sections[key] for key in previous.get("scenarios", []) if key in sections}
+
+        scenario_keys = [scenario_fingerprint(scenario) for scenario in scenario_lines]
+        partial = PartialTestFile(output_test_file, fingerprint(GENERATOR_VERSION + mode + swagger_hash))
+        resumed = {}
+        if write_outputs and resume:
+            resumed = {key: section for key, section in partial.resume().items() if key in scenario_keys}
+        elif write_outputs:
+            partial.path.unlink(missing_ok=True)
+        reusable.update(resumed)
+
+        pending = [scenario for scenario, key in zip(scenario_lines, scenario_keys) if key not in reusable]
+        # Spec-derived tests depend on the spec and the mode even when no scenario reaches the model.
+        if (not pending and not resumed and previous.get("requirements") == requirements_hash
+                and previous.get("swagger") == swagger_hash and previous.get("mode", "shared") == mode
+                and previous.get("synthesis", False) == synthesis and previous.get("dedup") == dedup_threshold):
+            log(f"⏭️  Up to date: {api_dir.name}")
+            return
+
+        if write_outputs:
+            partial.start()
+        progress.add_scenarios(len(pending))
+
+        # Validation (and any repair) of a batch runs as soon as the batch is back, while the
+        # other batches are still being generated.
+        validator = Validator(api_dir.name, collectors, isolated) if collectors is not None and write_outputs else None
+
+        async def check(section, ok):
+            if validator is None or not ok:
+                return section, ok
+            return await validate_section(llm, validator, section, stats, max_repairs, instructions)
+
+        async def run_batch(batch):
+            with tracer.span("tests", scenarios=len(batch)):
+                batch_results = await generate_test_batch(llm, spec_index, batch, stats, instructions)
+            batch_results = await asyncio.gather(*(check(section, ok) for section, ok in batch_results))
+            if write_outputs:
+                for section, ok in batch_results:
+                    if ok:
+                        partial.append(section)
+            progress.scenarios_done(len(batch))
+            return batch_results
+
+        # gather() keeps results in scenario order no matter which request finishes first,
+        # so the written file is the same from run to run.
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        try:
+            batch_results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        finally:
+            if validator is not None:
+                validator.close()
+        results = [result for batch in batch_results for result in batch]
+        if not write_outputs:
+            log(f"✅ Cache warmed for: {api_dir.name}")
+            return
+
+        generated = dict(zip((scenario_fingerprint(scenario) for scenario in pending), results))
+        sections = [f"{SCENARIO_MARKER}{case['scenario']}\n{case['code']}" for case in synthesized]
+        succeeded = []
+        for key in scenario_keys:
+            if key in reusable:
+                sections.append(reusable[key])
+                succeeded.append(key)
+            else:
+                section, ok = generated[key]
+                sections.append(section)
+                if ok:
+                    succeeded.append(key)
+
+        with tracer.span("postprocess.assemble", sections=len(sections)):
+            content = assemble_test_file(sections, header, api_dir.name, isolated)
+        with tracer.span("write", bytes=len(content.encode("utf-8"))):
+            partial.finish(content)
+        log(f"✅ Tests written to: {output_test_file} ({len(pending)} generated, {len(scenario_lines) - len(pending)} reused)")
+
+        # Failed scenarios are left out so the next run retries them.
+        manifest[api_dir.name] = {
+            "swagger": swagger_hash,
+            "requirements": requirements_hash,
+            "mode": mode,
+            "synthesis": synthesis,
+            "dedup": dedup_threshold,
+            "scenarios": succeeded
+        }
+
+
+async def generate_async(api_dirs, output_dir=DEFAULT_OUTPUT_DIR, manifest=None, options=Options(), share=1.0, show_progress=True):
+    # Runs the given APIs concurrently in this process and updates `manifest` (the previous
+    # entries, by API name) in place. `share` is the fraction of the rate limits this process
+    # may use when several processes generate at once.
+    # Imported here so that importing the package, listing APIs or reading reports never
+    # loads openai.
+    from openai import AsyncOpenAI
+    from .llm import LLM, Scheduler
+
+    manifest = {} if manifest is None else manifest
+    stats = Counter()
+    progress = Progress(show_progress)
+    tracer = Tracer(options.otel)
+    cache = ResponseCache(options.cache_path, options.cache_max_mb * 1024 * 1024) if options.cache_path else None
+    collectors = None
+
+    def scaled(limit):
+        return max(1, int(limit * share)) if limit else None
+
+    try:
+        # Retries are owned by the scheduler, so the client's own retry loop is switched off.
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, timeout=REQUEST_TIMEOUT) as client:
+            scheduler = Scheduler(scaled(options.max_concurrency), scaled(options.requests_per_minute),
+                                  scaled(options.tokens_per_minute), options.max_retries, share)
+            llm = LLM(client, scheduler, cache, progress, tracer)
+            # One pool of collector processes for every API, no larger than the number of
+            # requests that can be in flight: checks cannot outnumber the tests coming back.
+            if options.validate and not options.warm_cache:
+                collectors = CollectorPool(scaled(options.max_concurrency))
+            await asyncio.gather(*(
+                process_api(llm, Path(api_dir), output_dir, manifest, stats, progress, options.batch_size,
+                            write_outputs=not options.warm_cache, resume=not options.force, isolated=options.isolated,
+                            synthesis=options.synthesis, collectors=collectors, max_repairs=options.max_repairs,
+                            spec_cache_dir=options.spec_cache_dir, dedup_threshold=options.dedup_threshold)
+                for api_dir in api_dirs
+            ))
+    finally:
+        progress.close()
+        if collectors is not None:
+            await collectors.close()
+        if cache is not None:
+            stats["cache_hits"] += cache.hits
+            stats["cache_misses"] += cache.misses
+            cache.close()
+
+    stats["retries"] += scheduler.retries
+    stats["rate_limited"] += scheduler.rate_limited
+    for span in tracer.spans:
+        # Live OpenTelemetry spans stay in the process that exported them.
+        span.otel = None
+    return {"manifest": manifest, "stats": stats, "spans": tracer.spans}
+
+
+def _run_worker(api_dirs, output_dir, manifest, options, share):
+    return asyncio.run(generate_async(api_dirs, output_dir, manifest, options, share, show_progress=False))
+
+
+def generate(api_dirs, output_dir=DEFAULT_OUTPUT_DIR, manifest_path=None, options=Options(), workers=1,
+             report_path=None, trace_path=None):
+    # Generates scenarios and tests for one API directory or a list of them, and returns the
+    # run report. With workers > 1 the APIs are spread over a process pool, each process
+    # getting an equal share of the concurrency and rate limits; the manifest is only read
+    # and written here, in the parent.
+    api_dirs = [Path(api_dirs)] if isinstance(api_dirs, (str, os.PathLike)) else [Path(api_dir) for api_dir in api_dirs]
+    if not api_dirs:
+        log("⚠️  No API directories selected")
+        return None
+    manifest_path = Path(manifest_path) if manifest_path else api_dirs[0].parent / MANIFEST_NAME
+    previous = load_manifest(manifest_path)
+    manifest = {} if options.force else {api_dir.name: previous[api_dir.name] for api_dir in api_dirs if api_dir.name in previous}
+
+    workers = max(1, min(workers, len(api_dirs)))
+    if workers == 1:
+        results = [asyncio.run(generate_async(api_dirs, output_dir, manifest, options))]
+    else:
+        log(f"🧵 Spreading {len(api_dirs)} APIs over {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_run_worker, api_dirs[index::workers], output_dir,
+                            {api_dir.name: manifest[api_dir.name] for api_dir in api_dirs[index::workers] if api_dir.name in manifest},
+                            options, 1 / workers)
+                for index in range(workers)
+            ]
+            results = [future.result() for future in futures]
+
+    stats = Counter()
+    tracer = Tracer()
+    for result in results:
+        manifest.update(result["manifest"])
+        stats.update(result["stats"])
+        tracer.spans.extend(result["spans"])
+
+    if not options.warm_cache:
+        # Entries of APIs outside this run (other shards, other globs) are kept; entries of
+        # APIs that no longer exist are dropped. What exists is read from the directories the
+        # APIs live in, not from next to the manifest, which --manifest can put anywhere.
+        existing = {api_dir.name for root in {api_dir.parent for api_dir in api_dirs} for api_dir in root.iterdir() if api_dir.is_dir()}
+        merged = {name: entry for name, entry in load_manifest(manifest_path).items() if name in existing}
+        for api_dir in api_dirs:
+            merged.pop(api_dir.name, None)
+            if api_dir.name in manifest:
+                merged[api_dir.name] = manifest[api_dir.name]
+        save_manifest(manifest_path, merged)
+
+    if stats["scenarios_merged"]:
+        log(f"🔗 Deduplication: {stats['scenarios_merged']} near-duplicate scenarios merged")
+
+    if stats["synthesized_tests"]:
+        log(f"🧩 Spec synthesis: {stats['synthesized_tests']} tests, {stats['scenarios_covered']} scenarios needed no LLM call")
+
+    if stats["spec_tokens_full"]:
+        saved = stats["spec_tokens_full"] - stats["spec_tokens_sent"]
+        log(f"✂️  Spec slicing saved ~{saved} prompt tokens ({saved / stats['spec_tokens_full']:.0%} of spec tokens)")
+
+    if stats["spec_tokens_batched"]:
+        log(f"📦 Batching sent the spec once per batch, saving ~{stats['spec_tokens_batched']} more prompt tokens")
+
+    if stats["repair_attempts"] or stats["validation_failures"]:
+        log(f"🩺 Validation: {stats['repaired']} tests repaired with {stats['repair_attempts']} repair prompts, "
+            f"{stats['validation_failures']} still failing")
+
+    if stats["retries"]:
+        log(f"🔁 Retries: {stats['retries']} ({stats['rate_limited']} rate limited)")
+
+    if options.cache_path:
+        log(f"💾 Cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses")
+
+    report = tracer.report()
+    totals = report["totals"]
+    if totals["llm_calls"]:
+        log(f"📊 LLM: {totals['llm_calls']} calls ({totals['cache_hits']} cached), "
+            f"{totals['prompt_tokens']} prompt + {totals['completion_tokens']} completion tokens")
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+        log(f"📊 Run report written to: {report_path}")
+    if trace_path:
+        tracer.write_trace(trace_path)
+        log(f"📊 Spans written to: {trace_path}")
+    return report
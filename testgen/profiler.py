@@ -0,0 +1,298 @@
+# pytest plugin that profiles the HTTP traffic of the generated suites: requests, latency and
+# body bytes per test, per API and per operation, ranked by time spent waiting on the API.
+#
+#   python -m pytest -p testgen.profiler --profile-http tests/
+#   python -m pytest -p testgen.profiler --profile-http-json http-profile.json -n auto tests/
+#
+# Every request made through requests (the api_session fixture, or requests.get/post called
+# directly) is attributed to the test running it, including its setup and teardown.
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+PLUGIN_NAME = "testgen-http-profiler"
+WORKER_OUTPUT_KEY = "testgen_http_profile"
+# Path segments that are resource ids rather than part of the operation: numbers, UUIDs, hashes.
+ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,})$", re.IGNORECASE)
+TEMPLATE_PARAM_RE = re.compile(r"\{[^/}]+\}")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("testgen-profile", "HTTP profile of the generated tests")
+    group.addoption("--profile-http", action="store_true",
+                    help="Record requests, latency and bytes per test and print a ranked report per API and operation")
+    group.addoption("--profile-http-json", metavar="PATH",
+                    help="Also write the full HTTP profile as JSON (implies --profile-http)")
+    group.addoption("--profile-http-top", type=int, default=10, metavar="N",
+                    help="Rows per table in the printed report (default: %(default)s)")
+
+
+def pytest_configure(config):
+    if config.getoption("profile_http") or config.getoption("profile_http_json"):
+        profiler = HttpProfiler(config)
+        config.pluginmanager.register(profiler, PLUGIN_NAME)
+        profiler.start()
+
+
+def pytest_unconfigure(config):
+    profiler = config.pluginmanager.get_plugin(PLUGIN_NAME)
+    if profiler is not None:
+        profiler.stop()
+        config.pluginmanager.unregister(profiler)
+
+
+def api_name(item):
+    # The api(name=...) marker of --isolated suites, otherwise the tests/<api>/ directory.
+    marker = item.get_closest_marker("api")
+    if marker is not None and marker.kwargs.get("name"):
+        return marker.kwargs["name"]
+    return item.path.parent.name
+
+
+def operation_name(item, method, url):
+    # "POST /users/{id}": the operation(method=, path=) marker's path when the URL matches it,
+    # otherwise the URL path with id-like segments replaced by {id}.
+    path = urlsplit(url).path or "/"
+    marker = item.get_closest_marker("operation") if item is not None else None
+    template = marker.kwargs.get("path") if marker is not None else None
+    if template:
+        pattern = TEMPLATE_PARAM_RE.sub("[^/]+", re.escape(template).replace(r"\{", "{").replace(r"\}", "}"))
+        if re.search(pattern.rstrip("/") + "/?$", path):
+            return f"{method} {template}"
+    segments = ["{id}" if ID_SEGMENT_RE.match(segment) else segment for segment in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+def body_size(body):
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return 0
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def seconds(ms):
+    return f"{ms / 1000:.2f}s" if ms >= 1000 else f"{ms:.0f}ms"
+
+
+def size(count):
+    for unit in ("B", "KB", "MB"):
+        if count < 1024 or unit == "MB":
+            return f"{count:.0f}{unit}" if unit == "B" else f"{count:.1f}{unit}"
+        count /= 1024
+
+
+class HttpProfiler:
+    # Wraps requests.Session.send while the plugin is active. Redirects are followed inside
+    # the outer send, so they count towards the request that caused them.
+
+    def __init__(self, config):
+        self.config = config
+        self.tests = {}
+        self.calls = defaultdict(list)
+        self.current = None
+        self.local = threading.local()
+        self.original_send = None
+
+    def start(self):
+        profiler = self
+        original = self.original_send = requests.Session.send
+
+        def send(session, request, **kwargs):
+            if getattr(profiler.local, "active", False):
+                return original(session, request, **kwargs)
+            profiler.local.active = True
+            started = time.perf_counter()
+            response = error = None
+            try:
+                response = original(session, request, **kwargs)
+                return response
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                profiler.local.active = False
+                profiler.record(request, response, error, time.perf_counter() - started, kwargs.get("stream", False))
+
+        requests.Session.send = send
+
+    def stop(self):
+        if self.original_send is not None:
+            requests.Session.send = self.original_send
+            self.original_send = None
+
+    def record(self, request, response, error, elapsed, stream):
+        item = self.current
+        if item is None:
+            return
+        if response is None:
+            received = 0
+        elif not stream:
+            received = len(response.content or b"")
+        else:
+            received = int(response.headers.get("Content-Length") or 0)
+        body = request.body
+        key = hashlib.sha256(f"{request.method} {request.url} ".encode("utf-8") + (
+            body.encode("utf-8") if isinstance(body, str) else body if isinstance(body, bytes) else b"")).hexdigest()[:16]
+        self.calls[item.nodeid].append({
+            "operation": operation_name(item, request.method, request.url),
+            "status": response.status_code if response is not None else None,
+            "ms": elapsed * 1000,
+            "sent": body_size(body),
+            "received": received,
+            "error": error,
+            "key": key
+        })
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self.tests[item.nodeid] = {"api": api_name(item), "duration_ms": 0.0, "outcome": "passed"}
+        self.current = item
+        try:
+            yield
+        finally:
+            self.current = None
+
+    def pytest_runtest_logreport(self, report):
+        # Under xdist the controller sees every report too, but only workers run the tests;
+        # their numbers arrive through pytest_testnodedown.
+        test = self.tests.get(report.nodeid)
+        if test is None:
+            return
+        test["duration_ms"] += report.duration * 1000
+        if report.failed:
+            test["outcome"] = "failed"
+        elif report.skipped and test["outcome"] == "passed":
+            test["outcome"] = "skipped"
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        data = getattr(node, "workeroutput", {}).get(WORKER_OUTPUT_KEY)
+        if data:
+            data = json.loads(data)
+            self.tests.update(data["tests"])
+            for nodeid, calls in data["calls"].items():
+                self.calls[nodeid].extend(calls)
+
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, "workeroutput"):
+            self.config.workeroutput[WORKER_OUTPUT_KEY] = json.dumps({"tests": self.tests, "calls": self.calls})
+            return
+        path = self.config.getoption("profile_http_json")
+        if path:
+            Path(path).write_text(json.dumps(self.report(), indent=2) + "\n")
+
+    def report(self):
+        # Tests, APIs and operations, each ranked by the time spent in HTTP calls.
+        tests = []
+        apis = defaultdict(Counter)
+        operations = defaultdict(lambda: {"latencies": [], "totals": Counter(), "statuses": Counter()})
+        for nodeid, test in self.tests.items():
+            calls = self.calls.get(nodeid, [])
+            repeats = Counter(call["key"] for call in calls)
+            row = {
+                "test": nodeid,
+                "api": test["api"],
+                "outcome": test["outcome"],
+                "duration_ms": round(test["duration_ms"], 3),
+                "requests": len(calls),
+                "repeated_requests": sum(count - 1 for count in repeats.values()),
+                "http_ms": round(sum(call["ms"] for call in calls), 3),
+                "bytes_sent": sum(call["sent"] for call in calls),
+                "bytes_received": sum(call["received"] for call in calls),
+                "errors": sum(1 for call in calls if call["error"] or (call["status"] or 0) >= 500)
+            }
+            tests.append(row)
+            apis[test["api"]]["tests"] += 1
+            apis[test["api"]].update({key: row[key] for key in ("duration_ms", "requests", "repeated_requests", "http_ms",
+                                                                 "bytes_sent", "bytes_received", "errors")})
+            for call in calls:
+                operation = operations[(test["api"], call["operation"])]
+                operation["latencies"].append(call["ms"])
+                operation["totals"].update(requests=1, bytes_sent=call["sent"], bytes_received=call["received"],
+                                           errors=int(bool(call["error"]) or (call["status"] or 0) >= 500))
+                operation["statuses"][str(call["status"] or call["error"])] += 1
+
+        total_http = sum(row["http_ms"] for row in tests) or 1.0
+        total_duration = sum(row["duration_ms"] for row in tests) or 1.0
+        return {
+            "totals": {
+                "tests": len(tests),
+                "requests": sum(row["requests"] for row in tests),
+                "http_ms": round(sum(row["http_ms"] for row in tests), 3),
+                "duration_ms": round(sum(row["duration_ms"] for row in tests), 3)
+            },
+            "apis": [
+                {"api": api, **{key: round(value, 3) for key, value in totals.items()},
+                 "http_share": round(totals["http_ms"] / total_http, 4),
+                 "duration_share": round(totals["duration_ms"] / total_duration, 4)}
+                for api, totals in sorted(apis.items(), key=lambda item: -item[1]["http_ms"])
+            ],
+            "operations": sorted((
+                {"api": api, "operation": name, **operation["totals"],
+                 "total_ms": round(sum(operation["latencies"]), 3),
+                 "p50_ms": round(percentile(operation["latencies"], 0.5), 3),
+                 "p95_ms": round(percentile(operation["latencies"], 0.95), 3),
+                 "max_ms": round(max(operation["latencies"]), 3),
+                 "statuses": dict(operation["statuses"])}
+                for (api, name), operation in operations.items()
+            ), key=lambda row: -row["total_ms"]),
+            "tests": sorted(tests, key=lambda row: (-row["http_ms"], -row["duration_ms"]))
+        }
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workerinput"):
+            return
+        report = self.report()
+        top = self.config.getoption("profile_http_top")
+        write = terminalreporter.write_line
+        terminalreporter.write_sep("=", "HTTP profile")
+        totals = report["totals"]
+        write(f"{totals['requests']} requests in {totals['tests']} tests, {seconds(totals['http_ms'])} waiting on HTTP "
+              f"of {seconds(totals['duration_ms'])} in tests")
+        if not totals["requests"]:
+            return
+
+        write("")
+        write("APIs by HTTP time:")
+        for row in report["apis"][:top]:
+            write(f"  {row['api']:<24} {row['http_share']:>4.0%} {seconds(row['http_ms']):>8} HTTP {seconds(row['duration_ms']):>8} tests "
+                  f"{row['tests']:>5} tests {row['requests']:>6} requests {size(row['bytes_sent'])} sent {size(row['bytes_received'])} received")
+
+        write("")
+        write("Operations by HTTP time:")
+        for row in report["operations"][:top]:
+            write(f"  {row['api'] + ' ' + row['operation']:<40} {row['requests']:>6} requests {seconds(row['total_ms']):>8} total "
+                  f"p50 {seconds(row['p50_ms'])} p95 {seconds(row['p95_ms'])} max {seconds(row['max_ms'])} "
+                  f"{size(row['bytes_received'])} received" + (f" {row['errors']} errors" if row["errors"] else ""))
+
+        write("")
+        write("Slowest tests by HTTP time:")
+        for row in report["tests"][:top]:
+            write(f"  {seconds(row['http_ms']):>8} {row['requests']:>4} requests  {row['test']}")
+
+        repeated = sorted((row for row in report["tests"] if row["repeated_requests"]), key=lambda row: -row["repeated_requests"])
+        if repeated:
+            write("")
+            write("Tests sending identical requests more than once:")
+            for row in repeated[:top]:
+                write(f"  {row['repeated_requests']:>4} repeats of {row['requests']} requests  {row['test']}")
+
+        path = self.config.getoption("profile_http_json")
+        if path:
+            write("")
+            write(f"Full profile written to {path}")
+
@@ -0,0 +1,190 @@
+import contextvars
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from tqdm import tqdm
+
+# The span the running task is inside of; asyncio tasks inherit it from their creator,
+# so concurrent scenarios each nest under their own API.
+CURRENT_SPAN = contextvars.ContextVar("testgen_current_span", default=None)
+
+
+def log(message):
+    # tqdm.write keeps messages from tearing through the progress bar.
+    tqdm.write(message)
+
+
+class Progress:
+    # One tqdm bar over every scenario of the run; tqdm reports scenarios/sec and the
+    # postfix shows streamed completion tokens/sec.
+
+    def __init__(self, enabled=True):
+        self.bar = tqdm(total=0, unit="scenario", dynamic_ncols=True, disable=None if enabled else True)
+        self.started = time.monotonic()
+        self.tokens = 0
+
+    def add_scenarios(self, count):
+        self.bar.total += count
+        self.bar.refresh()
+
+    def add_tokens(self, count):
+        self.tokens += count
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        self.bar.set_postfix_str(f"{self.tokens / elapsed:.0f} tok/s", refresh=False)
+        self.bar.update(0)
+
+    def scenarios_done(self, count):
+        self.bar.update(count)
+
+    def close(self):
+        self.bar.close()
+
+
+class Span:
+    # One timed stage of a run, shaped like an OpenTelemetry span.
+
+    def __init__(self, name, trace_id, parent, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.otel = None
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def add(self, key, value):
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+def span_add(key, value):
+    # Adds to a counter on the current span, if any; used by code that does not own the span.
+    span = CURRENT_SPAN.get()
+    if span is not None:
+        span.add(key, value)
+
+
+def span_set(**attributes):
+    span = CURRENT_SPAN.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+class Tracer:
+    # Records a span for every stage of the run (API, spec load, LLM calls, post-processing,
+    # file write) for the run report. With otel=True the spans are also sent to the
+    # OpenTelemetry tracer, which exports wherever the installed SDK is configured to.
+
+    def __init__(self, otel=False):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.otel = None
+        if otel:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                log("⚠️  --otel needs the opentelemetry-api package; spans are only written to the run report")
+            else:
+                self.otel = trace
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = CURRENT_SPAN.get()
+        span = Span(name, self.trace_id, parent, attributes)
+        if self.otel is not None:
+            context = self.otel.set_span_in_context(parent.otel) if parent is not None and parent.otel else None
+            span.otel = self.otel.get_tracer("testgen").start_span(name, context=context, start_time=span.start_ns)
+        token = CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            CURRENT_SPAN.reset(token)
+            span.end_ns = time.time_ns()
+            self.spans.append(span)
+            if span.otel is not None:
+                span.otel.set_attributes({key: value for key, value in span.attributes.items() if value is not None})
+                if span.status == "error":
+                    span.otel.set_status(self.otel.Status(self.otel.StatusCode.ERROR))
+                span.otel.end(end_time=span.end_ns)
+
+    def write_trace(self, path):
+        # One JSON object per span, in the order they finished.
+        with open(path, "w", encoding="utf-8") as f:
+            for span in self.spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+
+    def report(self):
+        # Totals per stage, per API and per prompt kind, to see where a run's time and tokens went.
+        stages = defaultdict(list)
+        apis = defaultdict(Counter)
+        prompts = defaultdict(Counter)
+        for span in self.spans:
+            stages[span.name].append(span.duration_ms)
+            if span.name == "api":
+                apis[span.attributes["api"]]["duration_ms"] += span.duration_ms
+            if span.name != "llm.call":
+                continue
+
+            api = span.attributes.get("api")
+            usage = {key: span.attributes.get(key, 0) for key in ("prompt_tokens", "completion_tokens", "retries")}
+            for totals in (apis[api], prompts[span.attributes.get("prompt")]):
+                totals["calls"] += 1
+                totals["cache_hits"] += bool(span.attributes.get("cache_hit"))
+                totals["llm_ms"] += span.duration_ms
+                totals.update(usage)
+
+        def summary(durations):
+            durations = sorted(durations)
+            return {
+                "count": len(durations),
+                "total_ms": round(sum(durations), 3),
+                "p50_ms": round(durations[len(durations) // 2], 3),
+                "p95_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+                "max_ms": round(durations[-1], 3)
+            }
+
+        def rounded(totals):
+            return {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()}
+
+        llm_calls = [span for span in self.spans if span.name == "llm.call"]
+        return {
+            "trace_id": self.trace_id,
+            "wall_ms": round(max((span.end_ns for span in self.spans), default=0) / 1e6
+                             - min((span.start_ns for span in self.spans), default=0) / 1e6, 3),
+            "totals": {
+                "llm_calls": len(llm_calls),
+                "cache_hits": sum(bool(span.attributes.get("cache_hit")) for span in llm_calls),
+                "prompt_tokens": sum(span.attributes.get("prompt_tokens", 0) for span in llm_calls),
+                "completion_tokens": sum(span.attributes.get("completion_tokens", 0) for span in llm_calls),
+                "retries": sum(span.attributes.get("retries", 0) for span in llm_calls),
+                "scenarios_merged": sum(span.attributes.get("merged", 0) for span in self.spans if span.name == "dedup")
+            },
+            "stages": {name: summary(durations) for name, durations in sorted(stages.items())},
+            "apis": {api: rounded(totals) for api, totals in sorted(apis.items(), key=lambda item: -item[1]["duration_ms"])},
+            "prompts": {prompt: rounded(totals) for prompt, totals in sorted(prompts.items(), key=lambda item: str(item[0]))}
+        }
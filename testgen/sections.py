@@ -0,0 +1,111 @@
+import ast
+import hashlib
+import json
+import os
+import re
+
+from .config import GENERATOR_VERSION
+
+# Every scenario's code in a generated file starts with this marker, which is how
+# unchanged tests are found again and copied over on the next run.
+SCENARIO_MARKER = "# Scenario: "
+SCENARIO_NUMBER_RE = re.compile(r"^\d+[.)]\s*")
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def scenario_fingerprint(scenario):
+    # Numbering is ignored so inserting a scenario does not invalidate every line after it.
+    return fingerprint(SCENARIO_NUMBER_RE.sub("", scenario.strip()))
+
+
+def load_manifest(path):
+    if not path.exists():
+        return {}
+
+    manifest = json.loads(path.read_text())
+    if manifest.get("generator_version") != GENERATOR_VERSION:
+        return {}
+    return manifest.get("apis", {})
+
+
+def save_manifest(path, apis):
+    manifest = {"generator_version": GENERATOR_VERSION, "apis": apis}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+
+
+def read_sections(test_file):
+    if not test_file.exists():
+        return "", {}
+    return split_sections(test_file.read_text())
+
+
+def split_sections(text):
+    # Split a generated test file into its header (hoisted imports) and {scenario fingerprint: section text}.
+    header = []
+    sections = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith(SCENARIO_MARKER):
+            current = scenario_fingerprint(line[len(SCENARIO_MARKER):])
+            sections[current] = [line]
+        elif current is not None:
+            sections[current].append(line)
+        else:
+            header.append(line)
+
+    return "\n".join(header), {key: "\n".join(lines).strip() for key, lines in sections.items()}
+
+
+class PartialTestFile:
+    # Every finished scenario is appended and flushed to <test file>.partial as soon as it is
+    # generated, and the assembled file replaces the real one atomically at the end. A partial
+    # file left behind by an interrupted run is resumed as long as its key (spec and generator
+    # version) still matches.
+
+    def __init__(self, test_file, key):
+        self.test_file = test_file
+        self.path = test_file.with_name(test_file.name + ".partial")
+        self.stamp = f"# testgen-partial: {key}"
+
+    def resume(self):
+        if not self.path.exists():
+            return {}
+
+        text = self.path.read_text()
+        if not text.startswith(self.stamp + "\n"):
+            self.path.unlink()
+            return {}
+
+        # A section cut short by the interruption will not parse; it is simply generated again.
+        sections = {}
+        for key, section in split_sections(text)[1].items():
+            try:
+                ast.parse(section)
+            except SyntaxError:
+                continue
+            sections[key] = section
+        return sections
+
+    def start(self):
+        if not self.path.exists():
+            self.path.write_text(self.stamp + "\n\n")
+
+    def append(self, section):
+        with self.path.open("a") as partial:
+            partial.write(section + "\n\n")
+            partial.flush()
+            os.fsync(partial.fileno())
+
+    def finish(self, content):
+        staged = self.test_file.with_name(self.test_file.name + ".tmp")
+        staged.write_text(content)
+        os.replace(staged, self.test_file)
+        self.path.unlink(missing_ok=True)
+
+
+def parse_scenarios(text):
+    return [line.strip("- ").strip() for line in text.splitlines() if line.strip()]
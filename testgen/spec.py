@@ -0,0 +1,168 @@
+import re
+
+import yaml
+
+from .sections import fingerprint
+
+# libyaml's C loader and dumper are several times faster on large specs; without libyaml,
+# PyYAML's pure-Python ones are used.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class NoAliasDumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    # Objects shared by several operations (a schema used twice, YAML anchors in the source)
+    # are written out in full each time rather than as &id001/*id001 for the model to resolve.
+    def ignore_aliases(self, data):
+        return True
+
+
+YAML_DUMPER = NoAliasDumper
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+SPEC_TOP_LEVEL_KEYS = ("openapi", "swagger", "info", "servers", "host", "basePath", "schemes", "consumes", "produces", "security")
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "api", "are", "be", "for", "if", "in", "is", "it", "of", "on", "or",
+             "should", "test", "that", "the", "to", "when", "with"}
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English and YAML; only used to compare prompt sizes.
+    return (len(text) + 3) // 4
+
+
+def keywords(text):
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return set(WORD_RE.findall(text.lower())) - STOPWORDS
+
+
+class SpecIndex:
+    # Parses a spec once and indexes it by operation, so each scenario's prompt carries only
+    # the matching path/operation and the $ref'd definitions it needs instead of the whole spec.
+
+    # `spec` is the already parsed (and bundled) document when the caller has it, and `sources`
+    # the {path: fingerprint} of the other files it was bundled from; both count towards the
+    # spec's fingerprint so that editing a referenced file regenerates the tests.
+    def __init__(self, swagger, spec=None, sources=None):
+        self.text = swagger
+        self.sources = sources or {}
+        self.fingerprint = fingerprint(swagger + "".join(digest for _, digest in sorted(self.sources.items())))
+        self.size = len(swagger)
+        self.spec = spec
+        if spec is None:
+            try:
+                self.spec = yaml.load(swagger, Loader=YAML_LOADER)
+            except yaml.YAMLError:
+                self.spec = None
+
+        self.operations = []
+        if isinstance(self.spec, dict):
+            for path, item in (self.spec.get("paths") or {}).items():
+                for method, operation in (item or {}).items():
+                    if method in HTTP_METHODS and isinstance(operation, dict):
+                        self.operations.append((path, method, operation, self._operation_keywords(path, method, operation)))
+
+    @staticmethod
+    def _operation_keywords(path, method, operation):
+        words = keywords(path) | {method}
+        for field in ("operationId", "summary", "description"):
+            words |= keywords(operation.get(field, ""))
+        for tag in operation.get("tags", []):
+            words |= keywords(tag)
+        words |= {str(code) for code in (operation.get("responses") or {})}
+        return words
+
+    def match(self, scenario):
+        if len(self.operations) <= 1:
+            return self.operations
+
+        scenario_words = keywords(scenario)
+        scored = [(len(scenario_words & operation[3]), operation) for operation in self.operations]
+        best = max(score for score, _ in scored)
+        if best == 0:
+            return []
+        return [operation for score, operation in scored if score == best]
+
+    def resolve(self, schema):
+        # Follow local $refs and merge allOf, which is all the synthesis below needs.
+        seen = set()
+        while isinstance(schema, dict) and isinstance(schema.get("$ref"), str) and schema["$ref"] not in seen:
+            seen.add(schema["$ref"])
+            try:
+                schema = self._lookup(self._ref_parts(schema["$ref"]))
+            except (KeyError, TypeError):
+                return {}
+        if not isinstance(schema, dict):
+            return {}
+        if "allOf" in schema:
+            merged = {"type": "object", "properties": {}, "required": []}
+            for part in [schema] + [self.resolve(part) for part in schema["allOf"]]:
+                merged["properties"].update(part.get("properties") or {})
+                merged["required"] += part.get("required") or []
+            return merged
+        return schema
+
+    def slice_for(self, scenarios):
+        # Returns the spec text to send for these scenarios, falling back to the full spec
+        # whenever a scenario cannot be tied to an operation.
+        if not self.operations:
+            return self.text
+
+        matched = []
+        for scenario in scenarios:
+            operations = self.match(scenario)
+            if not operations:
+                return self.text
+            matched.extend(operation for operation in operations if operation not in matched)
+
+        sliced = {key: self.spec[key] for key in SPEC_TOP_LEVEL_KEYS if key in self.spec}
+        paths = {}
+        for path, method, operation, _ in matched:
+            item = paths.setdefault(path, {})
+            path_parameters = self.spec["paths"][path].get("parameters")
+            if path_parameters:
+                item["parameters"] = path_parameters
+            item[method] = operation
+        sliced["paths"] = paths
+
+        refs = set()
+        self._collect_refs(paths, refs)
+        for ref in sorted(refs):
+            parts = self._ref_parts(ref)
+            target = sliced
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = self._lookup(parts)
+
+        security_schemes = (self.spec.get("components") or {}).get("securitySchemes")
+        if security_schemes and ("security" in sliced or any("security" in operation for _, _, operation, _ in matched)):
+            sliced.setdefault("components", {})["securitySchemes"] = security_schemes
+
+        sliced_text = yaml.dump(sliced, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True)
+        return sliced_text if estimate_tokens(sliced_text) < estimate_tokens(self.text) else self.text
+
+    @staticmethod
+    def _ref_parts(ref):
+        return [part.replace("~1", "/").replace("~0", "~") for part in ref[2:].split("/")]
+
+    def _lookup(self, parts):
+        node = self.spec
+        for part in parts:
+            node = node[part]
+        return node
+
+    def _collect_refs(self, node, found):
+        # Local refs are followed transitively so nested schemas come along too.
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/") and ref not in found:
+                try:
+                    target = self._lookup(self._ref_parts(ref))
+                except (KeyError, TypeError):
+                    target = None
+                if target is not None:
+                    found.add(ref)
+                    self._collect_refs(target, found)
+            for value in node.values():
+                self._collect_refs(value, found)
+        elif isinstance(node, list):
+            for value in node:
+                self._collect_refs(value, found)
@@ -0,0 +1,228 @@
+import datetime
+import itertools
+import re
+
+from .spec import WORD_RE, keywords
+
+# Scenario wording that maps onto a spec-derived test kind. Scenarios asking for anything
+# beyond the status code (body contents, headers, ...) are left to the LLM.
+SYNTH_SCENARIO_PREFIX = "[spec] "
+STATUS_CODE_RE = re.compile(r"\b[1-5]\d\d\b")
+DETAIL_WORDS = {"body", "contain", "contains", "header", "headers", "id", "include", "includes", "message", "not", "token"}
+MISSING_WORDS = {"missing", "omitted", "omit", "omits", "without", "absent"}
+WRONG_TYPE_WORDS = {"type", "types", "numeric", "integer", "number", "boolean"}
+INVALID_WORDS = {"invalid", "incorrect", "wrong", "malformed", "bad"}
+BOUNDARY_WORDS = {"less", "short", "shorter", "least", "minimum", "long", "longer", "maximum", "exceed", "exceeds", "exceeding", "most"}
+SUCCESS_WORDS = {"succeed", "succeeds", "success", "successful", "successfully"}
+NOT_HAPPY_WORDS = INVALID_WORDS | BOUNDARY_WORDS | MISSING_WORDS | {"already", "conflict", "duplicate", "empty", "existing", "format",
+                                                                     "special", "unauthorized"}
+NEGATIVE_STATUS_CODES = ("400", "422")
+SAMPLE_STRINGS = {
+    "email": "user@example.com",
+    "date": "2024-01-01",
+    "date-time": "2024-01-01T00:00:00Z",
+    "uuid": "00000000-0000-0000-0000-000000000000",
+    "uri": "https://example.com",
+    "password": "Passw0rd!"
+}
+# Formats implied by a property's name when the schema gives none ("email", "user_email", ...).
+NAME_FORMATS = (("email", "email"), ("password", "password"), ("uuid", "uuid"), ("url", "uri"))
+WRONG_TYPE_VALUES = {
+    "string": 12345,
+    "integer": "not-a-number",
+    "number": "not-a-number",
+    "boolean": "not-a-boolean",
+    "array": "not-an-array",
+    "object": "not-an-object"
+}
+
+
+def json_value(value):
+    # Unquoted YAML dates (example: 2024-01-01) load as date/datetime objects, which neither
+    # render as a literal nor serialize to JSON; the API would receive their ISO form.
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: json_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_value(item) for item in value]
+    return value
+
+
+def sample_value(spec_index, schema, depth=0, name=""):
+    schema = spec_index.resolve(schema)
+    for field in ("example", "default"):
+        if field in schema:
+            return json_value(schema[field])
+    if schema.get("enum"):
+        return json_value(schema["enum"][0])
+
+    kind = schema.get("type") or ("object" if "properties" in schema else "string")
+    if kind == "object":
+        if depth > 4:
+            return {}
+        return {key: sample_value(spec_index, prop, depth + 1, key) for key, prop in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return [sample_value(spec_index, schema.get("items") or {}, depth + 1, name)] * max(1, schema.get("minItems", 1))
+    if kind == "integer":
+        return schema.get("minimum", 1)
+    if kind == "number":
+        return float(schema.get("minimum", 1))
+    if kind == "boolean":
+        return True
+
+    implied = next((candidate for word, candidate in NAME_FORMATS if word in name.lower()), None)
+    value = SAMPLE_STRINGS.get(schema.get("format") or implied, "string")
+    return value.ljust(schema.get("minLength", 0), "x")
+
+
+def has_examples(spec_index, schema, depth=0):
+    # Whether every value sample_value would send comes from the spec (example, default or
+    # enum) rather than a placeholder such as "string" or 1.
+    schema = spec_index.resolve(schema)
+    if any(field in schema for field in ("example", "default")) or schema.get("enum"):
+        return True
+    if depth > 4:
+        return False
+    kind = schema.get("type") or ("object" if "properties" in schema else "string")
+    if kind == "object":
+        return all(has_examples(spec_index, prop, depth + 1) for prop in (schema.get("properties") or {}).values())
+    if kind == "array":
+        return has_examples(spec_index, schema.get("items") or {}, depth + 1)
+    return False
+
+
+def expected_status_assertion(responses, codes):
+    documented = [code for code in codes if code in responses]
+    if len(documented) == 1:
+        return f"response.status_code == {documented[0]}"
+    if documented:
+        return f"response.status_code in ({', '.join(documented)})"
+    return "400 <= response.status_code < 500"
+
+
+def synthesize_tests(spec_index):
+    # Template tests derived from each operation's JSON requestBody schema and documented
+    # responses: a happy path, one test per missing required field, per wrongly typed
+    # property, per violated length/range bound and per invalid format. No model is involved,
+    # so these are instant and identical on every run.
+    cases = []
+    names = set()
+    for path, method, operation, _ in spec_index.operations:
+        responses = {str(code) for code in (operation.get("responses") or {})}
+        body = spec_index.resolve(operation.get("requestBody") or {})
+        schema = spec_index.resolve(((body.get("content") or {}).get("application/json") or {}).get("schema") or {})
+        properties = {name: spec_index.resolve(prop) for name, prop in (schema.get("properties") or {}).items()}
+        if not properties:
+            continue
+
+        url = path
+        for parameter in (spec_index.spec["paths"][path].get("parameters") or []) + (operation.get("parameters") or []):
+            parameter = spec_index.resolve(parameter)
+            if parameter.get("in") == "path":
+                url = url.replace("{" + parameter["name"] + "}", str(sample_value(spec_index, parameter.get("schema") or {}, name=parameter["name"])))
+
+        payload = sample_value(spec_index, schema)
+        slug = "_".join(WORD_RE.findall(f"{method} {path}".lower()))
+        label = f"{method.upper()} {path}"
+        negative = expected_status_assertion(responses, NEGATIVE_STATUS_CODES)
+        examples = has_examples(spec_index, schema)
+
+        def case(kind, name, description, body, assertion, field=None):
+            # Property names need not be identifiers ("user-name"), and two can fold onto the
+            # same one ("user-name", "user_name"), so names are normalized and numbered.
+            function = f"test_spec_{slug}_{'_'.join(WORD_RE.findall(name.lower()))}".rstrip("_")
+            if function in names:
+                function = next(f"{function}_{number}" for number in itertools.count(2) if f"{function}_{number}" not in names)
+            names.add(function)
+            cases.append({
+                "operation": (path, method),
+                "kind": kind,
+                "field": field,
+                "examples": examples,
+                "scenario": f"{SYNTH_SCENARIO_PREFIX}{label}: {description}",
+                "code": (
+                    f"def {function}(api_session):\n"
+                    f"    payload = {body!r}\n"
+                    f"    response = api_session.{method}({url!r}, json=payload)\n"
+                    f"    assert {assertion}\n"
+                )
+            })
+
+        success = sorted(code for code in responses if code.startswith("2"))
+        if success:
+            case("happy", "happy_path", f"valid payload returns {success[0]}", payload, f"response.status_code == {success[0]}")
+
+        for field in schema.get("required") or []:
+            if field in payload:
+                body = {name: value for name, value in payload.items() if name != field}
+                case("missing", f"missing_{field}", f"missing required field '{field}' is rejected", body, negative, field)
+
+        for field, prop in properties.items():
+            wrong = WRONG_TYPE_VALUES.get(prop.get("type"))
+            if wrong is not None:
+                case("wrong_type", f"wrong_type_{field}", f"'{field}' with the wrong type is rejected",
+                     {**payload, field: wrong}, negative, field)
+
+            bounds = []
+            if prop.get("type") == "string" and prop.get("minLength", 0) > 0:
+                bounds.append(("too_short", "x" * (prop["minLength"] - 1), f"shorter than {prop['minLength']} characters"))
+            if prop.get("type") == "string" and "maxLength" in prop:
+                bounds.append(("too_long", "x" * (prop["maxLength"] + 1), f"longer than {prop['maxLength']} characters"))
+            if prop.get("type") in ("integer", "number") and "minimum" in prop:
+                bounds.append(("below_minimum", prop["minimum"] - 1, f"below the minimum of {prop['minimum']}"))
+            if prop.get("type") in ("integer", "number") and "maximum" in prop:
+                bounds.append(("above_maximum", prop["maximum"] + 1, f"above the maximum of {prop['maximum']}"))
+            for name, value, description in bounds:
+                case("boundary", f"{field}_{name}", f"'{field}' {description} is rejected", {**payload, field: value}, negative, field)
+
+            if prop.get("type") == "string" and prop.get("format") in SAMPLE_STRINGS and prop.get("format") != "password":
+                case("format", f"invalid_{field}_format", f"'{field}' not in {prop['format']} format is rejected",
+                     {**payload, field: "not-a-valid-" + prop["format"]}, negative, field)
+    return cases
+
+
+def classify_scenario(scenario):
+    words = set(WORD_RE.findall(scenario.lower()))
+    if words & DETAIL_WORDS:
+        return None
+    if words & MISSING_WORDS or ("required" in words and words & {"field", "fields"}):
+        return "missing"
+    if words & WRONG_TYPE_WORDS and words & INVALID_WORDS:
+        return "wrong_type"
+    if "format" in words:
+        return "format"
+    if words & BOUNDARY_WORDS:
+        return "boundary"
+    if words & SUCCESS_WORDS and not words & NOT_HAPPY_WORDS:
+        return "happy"
+    return None
+
+
+def covered_by_synthesis(spec_index, cases, scenario):
+    # A scenario is covered when it asks for a kind of check that was synthesized for the
+    # operation it refers to, and every field it names has such a check.
+    kind = classify_scenario(scenario)
+    if kind is None:
+        return False
+
+    operations = {(path, method) for path, method, _, _ in spec_index.match(scenario)}
+    candidates = [case for case in cases if case["kind"] == kind and case["operation"] in operations]
+    # A happy path built from placeholders ("string", 1) may well be rejected by a real API, so
+    # it only stands in for the model's test when the schema supplies the values.
+    if kind == "happy":
+        candidates = [case for case in candidates if case["examples"]]
+    # A status code the scenario insists on must be the one the template asserts.
+    codes = STATUS_CODE_RE.findall(scenario)
+    candidates = [case for case in candidates if all(code in case["code"] for code in codes)]
+    if not candidates or kind == "happy":
+        return bool(candidates)
+
+    scenario_words = keywords(scenario)
+    all_fields = {case["field"] for case in cases if case["operation"] in operations and case["field"]}
+    named = {field for field in all_fields if keywords(field) and keywords(field) <= scenario_words}
+    covered = {case["field"] for case in candidates}
+    if named:
+        return named <= covered
+    # "any required field" style scenarios are answered by the per-field missing tests.
+    return kind == "missing" and bool(keywords(scenario) & {"any", "all", "required"})
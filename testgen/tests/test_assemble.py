@@ -0,0 +1,111 @@
+import ast
+
+from testgen.assemble import assemble_test_file, extract_code, infer_operation, isolate_test_data
+from testgen.sections import SCENARIO_MARKER
+
+PARAMETRIZED_EMAILS = '''
+@pytest.mark.parametrize("email", ["taken@example.com", "other@example.com"])
+def test_register_rejects_taken_email(email, password="secret"):
+    response = requests.post(f"{BASE_URL}/register", json={"email": email, "password": password})
+    assert response.status_code == 409
+'''
+
+
+def test_parametrize_emails_stay_literal_and_base_url_is_not_part_of_the_path():
+    isolated = isolate_test_data(PARAMETRIZED_EMAILS, "auth")
+
+    # Decorator arguments are evaluated at import time, before any unique_id exists.
+    assert '["taken@example.com", "other@example.com"]' in isolated
+    assert "unique_id" not in isolated
+    assert "@pytest.mark.operation(method='POST', path='/register')" in isolated
+    ast.parse(isolated)
+
+
+def test_emails_in_the_body_get_the_unique_id():
+    isolated = isolate_test_data('def test_register():\n    payload = {"email": "new@example.com"}\n', "auth")
+
+    assert 'def test_register(unique_id):' in isolated
+    assert 'f"new+{unique_id}@example.com"' in isolated
+
+
+def test_infer_operation_reads_paths_after_the_base_url_only():
+    def operation(source):
+        return infer_operation(ast.parse(source).body[0])
+
+    assert operation('def test():\n    api_session.get(f"{base_url}/users/{user_id}")') == ("GET", "/users/{}")
+    assert operation('def test():\n    api_session.delete("users/1")') == ("DELETE", "/users/1")
+    assert operation('def test():\n    api_session.get(f"{host}/users")') is None
+
+
+def test_section_base_url_is_dropped_and_constants_lose_their_origin():
+    section = 'BASE_URL = "http://localhost:5000"\nLOGIN_URL = "http://localhost:5000/login"\n\n\n' \
+              'def test_login():\n    assert requests.post(LOGIN_URL).status_code == 200\n'
+    assembled = assemble_test_file([section])
+
+    assert assembled.count("BASE_URL =") == 1
+    assert 'LOGIN_URL = "/login"' in assembled
+    assert "def test_login(api_session):" in assembled
+
+
+LOGIN_SECTION = '''{marker}{scenario}
+import pytest, requests
+
+
+@pytest.fixture
+def user():
+    return {{"username": "{username}"}}
+
+
+def payload(user):
+    return {{**user, "password": "secret"}}
+
+
+@pytest.mark.usefixtures("user")
+def test_login(user):
+    assert requests.post("/login", json=payload(user)).status_code == 200
+'''
+
+
+def test_colliding_sections_keep_using_their_own_fixtures_and_helpers():
+    first = LOGIN_SECTION.format(marker=SCENARIO_MARKER, scenario="Alice logs in", username="alice")
+    second = LOGIN_SECTION.format(marker=SCENARIO_MARKER, scenario="Bob logs in", username="bob").replace(
+        "import pytest, requests", "import pytest")
+    assembled = assemble_test_file([first, second])
+    namespace = {}
+    exec(compile(assembled, "test_generated.py", "exec"), namespace)
+
+    assert {"user", "user_2", "payload", "payload_2", "test_login", "test_login_2"} <= set(namespace)
+    assert "def test_login_2(api_session, user_2):" in assembled
+    assert "json=payload_2(user_2)" in assembled
+    assert "def payload_2(user_2):" in assembled
+    assert "@pytest.mark.usefixtures('user_2')" in assembled
+    # `import pytest, requests` and `import pytest` are one import of pytest; requests is
+    # replaced by the session fixture and pruned.
+    assert assembled.count("import pytest") == 1
+    assert "import requests" not in assembled
+
+
+def test_imports_are_deduplicated_per_name():
+    sections = [
+        f"{SCENARIO_MARKER}one\nimport json, os\n\n\ndef test_one():\n    assert json.dumps(os.sep)",
+        f"{SCENARIO_MARKER}two\nimport json\nfrom pathlib import Path\n\n\ndef test_two():\n    assert json.dumps(str(Path()))",
+    ]
+    header = assemble_test_file(sections).split("\n\n", 1)[0].splitlines()
+
+    assert sorted(header) == ["from pathlib import Path", "import json", "import os"]
+
+
+def test_extract_code_keeps_fenced_python_and_drops_prose():
+    answer = (
+        "Here is the test you asked for:\n\n"
+        "```python\ndef test_login(api_session):\n    assert api_session.get('/login').status_code == 200\n```\n\n"
+        "And a variant:\n\n```\ndef test_logout(api_session):\n    pass\n```\n\n"
+        "```python\ndef test_broken(:\n```\n"
+        "It checks the status code."
+    )
+
+    assert extract_code(answer) == (
+        "def test_login(api_session):\n    assert api_session.get('/login').status_code == 200\n\n"
+        "def test_logout(api_session):\n    pass"
+    )
+    assert extract_code("Sorry, I cannot help with that.") is None
@@ -0,0 +1,27 @@
+import itertools
+
+from testgen import cache
+from testgen.cache import ResponseCache
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_cap(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+    value = "x" * 100
+    size = len(f'"{value}"')
+    responses = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=2 * size)
+    try:
+        responses.put("a", value)
+        responses.put("b", value)
+        # Reading "a" makes "b" the least recently used entry.
+        assert responses.get("a") == value
+        responses.put("c", value)
+
+        assert responses.get("b") is None
+        assert responses.get("a") == value and responses.get("c") == value
+        # One entry larger than the cap evicts everything older, and is kept itself only if it fits.
+        responses.put("d", value * 3)
+        assert [responses.get(key) for key in "acd"] == [None, None, None]
+        assert (responses.hits, responses.misses) == (3, 4)
+    finally:
+        responses.close()
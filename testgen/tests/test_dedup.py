@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import pytest
+
+from testgen.dedup import deduplicate_scenarios, normalize, stem
+from testgen.loader import parse_spec
+
+REGISTER_SWAGGER = Path(__file__).resolve().parents[2] / "apis" / "register" / "swagger.yaml"
+# The documented default; TESTGEN_DEDUP_THRESHOLD must not change what these pin.
+THRESHOLD = 0.8
+
+# (first, second, merged), with the register spec's fields known.
+PAIRS = [
+    # The README's example: the same successful login in different words.
+    ("1. Test that the API accepts valid email and password for login",
+     "2. Test that the API returns 200 OK when login is successful", True),
+    ("Registration fails when the email field is missing", "Registration is rejected without the email field", True),
+    ("Login returns 200 OK", "Login returns 200 OK", True),
+    # Failure cases about different fields are different tests.
+    ("Registration fails when the email field is empty", "Registration fails when the password field is empty", False),
+    # Different status codes, numbers or outcomes are never merged.
+    ("Login returns 401 for invalid credentials", "Login returns 403 for invalid credentials", False),
+    ("Password must be at least 8 characters", "Password must be at least 12 characters", False),
+    ("Login returns 200 when successful", "Login returns 401 when unsuccessful", False),
+]
+
+
+@pytest.mark.parametrize("first, second, merged", PAIRS)
+def test_scenario_pairs(first, second, merged):
+    kept, merges = deduplicate_scenarios([first, second], THRESHOLD, parse_spec(REGISTER_SWAGGER))
+
+    assert kept == ([first] if merged else [first, second])
+    assert [(merge.kept, merge.duplicate) for merge in merges] == ([(first, second)] if merged else [])
+
+
+@pytest.mark.parametrize("word, stemmed", [
+    ("fields", "field"), ("registering", "register"), ("registered", "register"), ("status", "status"), ("class", "class"),
+])
+def test_stem(word, stemmed):
+    assert stem(word) == stemmed
+
+
+@pytest.mark.parametrize("scenario, tokens", [
+    ("Returns 200 OK when login is successful", {"login", "success"}),
+    ("Rejects an empty password with 400", {"reject", "missing", "password", "400"}),
+    ("Verify the system responds correctly", set()),
+])
+def test_normalize(scenario, tokens):
+    assert normalize(scenario) == tokens
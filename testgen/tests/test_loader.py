@@ -0,0 +1,162 @@
+import textwrap
+
+import pytest
+
+from testgen import loader
+from testgen.loader import load_spec, parse_spec
+
+
+def write(directory, files):
+    for name, content in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(textwrap.dedent(content).lstrip())
+    return directory / "swagger.yaml"
+
+
+OPENAPI_ROOT = """
+    openapi: 3.0.0
+    info: {title: Users, version: 1.0.0}
+    paths:
+      /users/{id}:
+        parameters:
+          - $ref: "shared/params.yaml#/id"
+        post:
+          requestBody:
+            content:
+              application/json:
+                schema: {$ref: "shared/user.yaml#/User"}
+          responses:
+            '201':
+              $ref: "shared/responses.yaml#/components/responses/Created"
+    components:
+      schemas:
+        User: {type: string}
+"""
+
+
+def test_external_refs_are_bundled_under_components_and_rewritten(tmp_path):
+    swagger = write(tmp_path, {
+        "swagger.yaml": OPENAPI_ROOT,
+        # Refs inside a referenced file are relative to that file.
+        "shared/user.yaml": """
+            User:
+              type: object
+              properties:
+                address: {$ref: "address.yaml"}
+                tags:
+                  type: array
+                  items: {$ref: "#/Tag"}
+            Tag: {type: string}
+        """,
+        "shared/address.yaml": "type: object\nproperties:\n  city: {type: string}\n",
+        "shared/params.yaml": "id: {name: id, in: path, required: true, schema: {type: integer}}\n",
+        "shared/responses.yaml": "components:\n  responses:\n    Created: {description: Created}\n",
+    })
+    spec = parse_spec(swagger).spec
+    schemas = spec["components"]["schemas"]
+
+    # The root's own User is kept; the imported one is numbered.
+    assert schemas["User"] == {"type": "string"}
+    operation = spec["paths"]["/users/{id}"]["post"]
+    assert operation["requestBody"]["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/User_2"}
+    assert schemas["User_2"]["properties"]["address"] == {"$ref": "#/components/schemas/address"}
+    assert schemas["User_2"]["properties"]["tags"]["items"] == {"$ref": "#/components/schemas/Tag"}
+    assert schemas["address"]["properties"]["city"] == {"type": "string"}
+    # Refs whose pointer names no section go where their key says.
+    assert spec["paths"]["/users/{id}"]["parameters"] == [{"$ref": "#/components/parameters/id"}]
+    assert spec["components"]["parameters"]["id"]["in"] == "path"
+    assert operation["responses"]["201"] == {"$ref": "#/components/responses/Created"}
+
+
+def test_cyclic_refs_are_imported_once(tmp_path):
+    swagger = write(tmp_path, {
+        "swagger.yaml": """
+            openapi: 3.0.0
+            info: {title: Tree, version: 1.0.0}
+            paths:
+              /nodes:
+                post:
+                  requestBody:
+                    content:
+                      application/json:
+                        schema: {$ref: "node.yaml#/Node"}
+                  responses:
+                    '200': {description: OK}
+        """,
+        "node.yaml": """
+            Node:
+              type: object
+              properties:
+                children: {type: array, items: {$ref: "#/Node"}}
+                owner: {$ref: "owner.yaml#/Owner"}
+        """,
+        "owner.yaml": "Owner:\n  type: object\n  properties:\n    nodes: {type: array, items: {$ref: 'node.yaml#/Node'}}\n",
+    })
+    spec_index = parse_spec(swagger)
+    schemas = spec_index.spec["components"]["schemas"]
+
+    assert sorted(schemas) == ["Node", "Owner"]
+    assert schemas["Node"]["properties"]["children"]["items"] == {"$ref": "#/components/schemas/Node"}
+    assert schemas["Owner"]["properties"]["nodes"]["items"] == {"$ref": "#/components/schemas/Node"}
+    assert sorted(spec_index.sources) == sorted(str(tmp_path / name) for name in ("node.yaml", "owner.yaml"))
+
+
+def test_swagger2_refs_go_to_definitions_and_top_level_sections(tmp_path):
+    swagger = write(tmp_path, {
+        "swagger.yaml": """
+            swagger: "2.0"
+            info: {title: Users, version: 1.0.0}
+            paths:
+              /users:
+                post:
+                  parameters:
+                    - $ref: "common.yaml#/parameters/Trace"
+                    - {name: body, in: body, schema: {$ref: "common.yaml#/User"}}
+                  responses:
+                    '201': {$ref: "common.yaml#/Created"}
+        """,
+        "common.yaml": """
+            parameters:
+              Trace: {name: X-Trace, in: header, type: string}
+            User: {type: object}
+            Created: {description: Created}
+        """,
+    })
+    spec = parse_spec(swagger).spec
+    operation = spec["paths"]["/users"]["post"]
+
+    assert operation["parameters"][0] == {"$ref": "#/parameters/Trace"}
+    assert operation["parameters"][1]["schema"] == {"$ref": "#/definitions/User"}
+    assert operation["responses"]["201"] == {"$ref": "#/responses/Created"}
+    assert "components" not in spec
+    assert spec["definitions"]["User"] == {"type": "object"}
+
+
+def test_spec_cache_is_dropped_when_a_referenced_file_changes(tmp_path, monkeypatch):
+    swagger = write(tmp_path / "api", {"swagger.yaml": OPENAPI_ROOT, "shared/user.yaml": "User: {type: object}\n",
+                                       "shared/params.yaml": "id: {name: id, in: path}\n",
+                                       "shared/responses.yaml": "components:\n  responses:\n    Created: {description: Created}\n"})
+    parses = []
+    monkeypatch.setattr(loader, "parse_spec", lambda path: parses.append(path) or parse_spec(path))
+    cache_dir = tmp_path / "cache"
+
+    assert load_spec(swagger, cache_dir).spec["components"]["schemas"]["User_2"] == {"type": "object"}
+    load_spec(swagger, cache_dir)
+    assert len(parses) == 1
+
+    (swagger.parent / "shared" / "user.yaml").write_text("User: {type: object, required: [name]}\n")
+    assert load_spec(swagger, cache_dir).spec["components"]["schemas"]["User_2"]["required"] == ["name"]
+    assert len(parses) == 2
+
+
+@pytest.mark.parametrize("key, parent_key, section, expected", [
+    ("schema", None, "parameters", "schemas"),
+    ("items", None, "responses", "schemas"),
+    ("email", "properties", "parameters", "schemas"),
+    ("parameters", None, "schemas", "parameters"),
+    ("requestBody", None, "schemas", "requestBodies"),
+    ("description", None, "responses", "responses"),
+])
+def test_section_for(key, parent_key, section, expected):
+    assert loader.SpecBundler._section_for(key, parent_key, section) == expected
@@ -0,0 +1,98 @@
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from testgen.config import MANIFEST_NAME
+from testgen.loader import load_spec
+from testgen.pipeline import Options, generate
+from testgen.sections import load_manifest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "scripts"))
+from fake_openai_server import make_server  # noqa: E402
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "fake")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+SIGNUP_SPEC = '''openapi: 3.0.0
+info: {title: Signup, version: 1.0.0}
+paths:
+  /signup:
+    post:
+      summary: Sign up
+      requestBody:
+        content:
+          application/json:
+            schema:
+              type: object
+              required: [email, password]
+              properties:
+                email: {type: string}
+                password: {type: string}
+      responses:
+        '201': {description: Created}
+        '400': {description: Invalid input}
+'''
+
+
+@pytest.fixture
+def signup_api(tmp_path):
+    # Every scenario of this API is answered by a spec-derived test, so no test reaches the model.
+    api_dir = tmp_path / "apis" / "signup"
+    api_dir.mkdir(parents=True)
+    (api_dir / "swagger.yaml").write_text(SIGNUP_SPEC)
+    (api_dir / "requirements.txt").write_text("Signup without the email field is rejected.\n"
+                                               "Signup without the password field is rejected.\n")
+    return api_dir
+
+
+def test_spec_changes_regenerate_fully_synthesized_apis(fake_openai, signup_api, tmp_path):
+    options = Options(cache_path=None, validate=False, spec_cache_dir=None)
+    test_file = tmp_path / "tests" / "signup" / "test_signup_generated.py"
+    generate([signup_api], tmp_path / "tests", options=options)
+    assert "test_spec_post_signup_email_too_long" not in test_file.read_text()
+
+    swagger = signup_api / "swagger.yaml"
+    swagger.write_text(SIGNUP_SPEC.replace("email: {type: string}", "email: {type: string, maxLength: 64}"))
+    generate([signup_api], tmp_path / "tests", options=options)
+
+    assert "test_spec_post_signup_email_too_long" in test_file.read_text()
+    manifest = load_manifest(signup_api.parent / MANIFEST_NAME)
+    assert manifest["signup"]["swagger"] == load_spec(swagger).fingerprint
+
+
+def test_mode_changes_regenerate_fully_synthesized_apis(fake_openai, signup_api, tmp_path):
+    test_file = tmp_path / "tests" / "signup" / "test_signup_generated.py"
+    generate([signup_api], tmp_path / "tests", options=Options(cache_path=None, validate=False, spec_cache_dir=None, isolated=True))
+    assert "unique_id" in test_file.read_text()
+
+    generate([signup_api], tmp_path / "tests", options=Options(cache_path=None, validate=False, spec_cache_dir=None))
+
+    assert "unique_id" not in test_file.read_text()
+    assert "unique_id" not in (test_file.parent / "conftest.py").read_text()
+
+
+def test_shards_with_a_manifest_elsewhere_keep_each_others_entries(fake_openai, tmp_path):
+    apis = tmp_path / "apis"
+    for name in ("login", "register"):
+        shutil.copytree(ROOT / "apis" / name, apis / name)
+    manifest_path = tmp_path / ".ci" / "manifest.json"
+    options = Options(cache_path=None, validate=False, spec_cache_dir=None)
+
+    # One CI node per API, both pointing --manifest at the same file outside apis/.
+    for name in ("login", "register"):
+        generate([apis / name], tmp_path / "tests", manifest_path, options)
+
+    assert sorted(load_manifest(manifest_path)) == ["login", "register"]
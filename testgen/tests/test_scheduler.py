@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from openai import AsyncOpenAI
+
+from testgen.llm import LLM, Scheduler
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from fake_openai_server import make_server  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Requirements:\n\n1. Login returns 200."}]
+
+
+@pytest.fixture
+def fake_server():
+    # The same server as `python scripts/fake_openai_server.py --rpm 1`.
+    server = make_server(rpm=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_429_with_rate_limit_headers_lowers_concurrency(fake_server):
+    # Someone else sharing the budget used the only request of this minute, so the next
+    # request gets a 429 carrying x-ratelimit-remaining-requests: 0 and a reset time.
+    fake_server.fake.admit()
+
+    async def run():
+        base_url = f"http://127.0.0.1:{fake_server.server_address[1]}/v1"
+        async with AsyncOpenAI(api_key="fake", base_url=base_url, max_retries=0) as client:
+            scheduler = Scheduler(8, max_retries=1)
+            task = asyncio.create_task(LLM(client, scheduler).complete(MESSAGES, 0, 50))
+            deadline = time.monotonic() + 10
+            while not scheduler.rate_limited and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            # The retry would wait for the window to reset; only the reaction matters here.
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.rate_limited == 1
+    assert scheduler.limit == 4
+    assert scheduler.requests.capacity == 1
+    assert scheduler.paused_until > time.monotonic() + 30
+
+
+def test_429s_of_one_cooldown_halve_concurrency_once():
+    async def run():
+        scheduler = Scheduler(8)
+        for _ in range(3):
+            await scheduler._on_rate_limited(5)
+        return scheduler
+
+    assert asyncio.run(run()).limit == 4
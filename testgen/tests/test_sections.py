@@ -0,0 +1,28 @@
+from testgen.sections import SCENARIO_MARKER, PartialTestFile, scenario_fingerprint
+
+LOGIN = f"{SCENARIO_MARKER}1. Login returns 200\ndef test_login(api_session):\n    assert api_session.post('/login').status_code == 200"
+LOGOUT = f"{SCENARIO_MARKER}2. Logout returns 204\ndef test_logout(api_session):\n    assert api_session.post('/logout').status_code == 204"
+REGISTER = f"{SCENARIO_MARKER}3. Register returns 201\ndef test_register(api_session):\n    assert api_session.post('/register', json={{'email':"
+
+
+def test_resume_keeps_finished_sections_and_drops_a_truncated_last_one(tmp_path):
+    partial = PartialTestFile(tmp_path / "test_login_generated.py", "key")
+    partial.start()
+    partial.append(LOGIN)
+    partial.append(LOGOUT)
+    # The run was interrupted halfway through writing the third section.
+    with partial.path.open("a") as f:
+        f.write(REGISTER)
+
+    resumed = PartialTestFile(tmp_path / "test_login_generated.py", "key").resume()
+
+    assert resumed == {scenario_fingerprint("Login returns 200"): LOGIN, scenario_fingerprint("Logout returns 204"): LOGOUT}
+
+
+def test_resume_discards_a_partial_file_with_another_key(tmp_path):
+    partial = PartialTestFile(tmp_path / "test_login_generated.py", "old spec")
+    partial.start()
+    partial.append(LOGIN)
+
+    assert PartialTestFile(tmp_path / "test_login_generated.py", "new spec").resume() == {}
+    assert not partial.path.exists()
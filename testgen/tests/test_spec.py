@@ -0,0 +1,28 @@
+import yaml
+
+from testgen.spec import SpecIndex
+
+USER_SCHEMA = "{type: object, properties: {name: {type: string}, email: {type: string}}}"
+
+
+def test_sliced_spec_writes_shared_schemas_out_in_full():
+    # Both user operations share one schema object, through a YAML anchor.
+    unrelated = "".join(
+        f"  /reports{index}:\n    get:\n      summary: Download report {index}\n      responses:\n        '200': {{description: OK}}\n"
+        for index in range(20)
+    )
+    text = (
+        "openapi: 3.0.0\ninfo: {title: Users, version: 1.0.0}\npaths:\n"
+        "  /users:\n    post:\n      summary: Create user\n      requestBody:\n        content:\n          application/json:\n"
+        f"            schema: &user {USER_SCHEMA}\n      responses:\n        '201': {{description: Created}}\n"
+        "    put:\n      summary: Update user\n      requestBody:\n        content:\n          application/json:\n"
+        "            schema: *user\n      responses:\n        '200': {description: OK}\n" + unrelated
+    )
+    spec_index = SpecIndex(text)
+
+    sliced = spec_index.slice_for(["Create user returns 201", "Update user returns 200"])
+
+    assert sliced != text and "reports" not in sliced
+    assert "&" not in sliced and "*" not in sliced
+    users = yaml.safe_load(sliced)["paths"]["/users"]
+    assert users["post"]["requestBody"] == users["put"]["requestBody"]
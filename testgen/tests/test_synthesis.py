@@ -0,0 +1,71 @@
+import ast
+
+import yaml
+
+from testgen.spec import SpecIndex
+from testgen.synthesis import covered_by_synthesis, synthesize_tests
+
+REGISTER_SPEC = '''
+openapi: 3.0.0
+info: {title: Register, version: 1.0.0}
+paths:
+  /register:
+    post:
+      summary: User registration
+      requestBody:
+        content:
+          application/json:
+            schema:
+              type: object
+              required: [email, username]
+              properties:
+                email: {type: string}
+                username: {type: string%s}
+      responses:
+        '201': {description: Registration successful}
+        '400': {description: Invalid input}
+'''
+
+
+def spec_index(username_extra=""):
+    text = REGISTER_SPEC % username_extra
+    return SpecIndex(text, yaml.safe_load(text))
+
+
+def test_email_property_without_format_gets_an_email_sample():
+    happy = next(case for case in synthesize_tests(spec_index()) if case["kind"] == "happy")
+
+    assert "'email': 'user@example.com'" in happy["code"]
+
+
+def test_happy_path_covers_scenarios_only_with_example_values():
+    scenario = "Registration returns 201 when successful"
+    placeholders = spec_index()
+    examples = spec_index(", example: jane")
+
+    assert not covered_by_synthesis(placeholders, synthesize_tests(placeholders), scenario)
+    # One property without an example (here the email) is enough to keep the model's test.
+    assert not covered_by_synthesis(examples, synthesize_tests(examples), scenario)
+
+    text = (REGISTER_SPEC % ", example: jane").replace("email: {type: string}", "email: {type: string, example: jane@example.com}")
+    index = SpecIndex(text, yaml.safe_load(text))
+    assert covered_by_synthesis(index, synthesize_tests(index), scenario)
+
+
+def test_test_names_are_identifiers_and_unique_whatever_the_property_names():
+    text = REGISTER_SPEC.replace("email: {type: string}", "user-name: {type: string}\n                user_name: {type: string}\n"
+                                 "                名前: {type: string}").replace("[email, username]", "[user-name, user_name, 名前]")
+    cases = synthesize_tests(SpecIndex(text, yaml.safe_load(text)))
+    names = [ast.parse(case["code"]).body[0].name for case in cases]
+
+    assert "test_spec_post_register_missing_user_name_2" in names
+    assert len(names) == len(set(names))
+
+
+def test_unquoted_yaml_dates_are_sent_as_iso_strings():
+    text = REGISTER_SPEC.replace("email: {type: string}", "email: {type: string}\n                born: {type: string, example: 2024-01-01}\n"
+                                 "                seen: {type: string, default: 2024-01-01T10:00:00Z}")
+    happy = next(case for case in synthesize_tests(SpecIndex(text, yaml.safe_load(text))) if case["kind"] == "happy")
+
+    assert "'born': '2024-01-01'" in happy["code"]
+    assert "'seen': '2024-01-01T10:00:00+00:00'" in happy["code"]
@@ -0,0 +1,30 @@
+import asyncio
+
+from testgen.sections import SCENARIO_MARKER
+from testgen.validation import CollectorPool, Validator
+
+GOOD = f"{SCENARIO_MARKER}Login works\ndef test_login(api_session):\n    assert True\n"
+BROKEN = (f"{SCENARIO_MARKER}Login breaks\nimport missing_module_for_validation\n\n"
+          "USERS = missing_module_for_validation.USERS\n\n\ndef test_login():\n    assert USERS\n")
+
+
+def test_validators_of_every_api_share_a_bounded_pool_of_collectors():
+    async def run():
+        collectors = CollectorPool(2)
+        validators = [Validator(f"api_{index}", collectors) for index in range(5)]
+        try:
+            errors = await asyncio.gather(*(
+                validator.check(section) for validator in validators for section in (GOOD, BROKEN, GOOD)
+            ))
+            started = sum(1 for collector in collectors.collectors if collector.process is not None)
+        finally:
+            for validator in validators:
+                validator.close()
+            await collectors.close()
+        return errors, started, collectors.root
+
+    errors, started, root = asyncio.run(run())
+    assert errors[0::3] == [None] * 5 and errors[2::3] == [None] * 5
+    assert all("missing_module_for_validation" in error for error in errors[1::3])
+    assert started == 2
+    assert not root.exists()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from .assemble import assemble_test_file, write_conftest
+
+# pytest exit code when collection succeeded but found no tests.
+NO_TESTS_COLLECTED = 5
+COLLECT_TIMEOUT = 60
+# Only the end of pytest's output is fed back to the model.
+ERROR_TAIL_LINES = 15
+ERROR_LINE_RE = re.compile(r"^(?:E\s+)?\w*(?:Error|Exception)\b")
+
+
+def error_summary(error):
+    # The line naming the exception, for the log; pytest's last line is only a tally.
+    lines = [line.strip() for line in error.splitlines() if line.strip()]
+    return next((line for line in reversed(lines) if ERROR_LINE_RE.match(line)), lines[-1] if lines else error)
+
+
+class Collector:
+    # One long-lived pytest collection worker (testgen.collector), started on first use and
+    # restarted after it hangs or crashes. Keeping pytest imported between checks is what
+    # makes a check take milliseconds.
+
+    def __init__(self, root):
+        self.root = root
+        self.process = None
+
+    async def collect(self, test_file):
+        if self.process is None or self.process.returncode is not None:
+            package_root = str(Path(__file__).resolve().parent.parent)
+            env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [package_root, os.getenv("PYTHONPATH")]))}
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "testgen.collector",
+                cwd=self.root,
+                env=env,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+
+        self.process.stdin.write((json.dumps({"path": str(test_file)}) + "\n").encode("utf-8"))
+        try:
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), COLLECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            await self._stop()
+            return -1, f"pytest collection timed out after {COLLECT_TIMEOUT}s"
+        if not line:
+            await self._stop()
+            return -1, "pytest collection crashed the collector process"
+        answer = json.loads(line)
+        return answer["exit"], answer["output"]
+
+    async def _stop(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        self.process = None
+
+    async def close(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.stdin.close()
+            await self.process.wait()
+        self.process = None
+
+
+class CollectorPool:
+    # At most `size` collectors, shared by the Validators of every API in the run. Each
+    # collector is started the first time all the others are busy, so a run never has more
+    # worker processes than checks in flight, however many APIs it covers. The scratch
+    # directory is laid out like tests/: one <api>/ directory per Validator.
+
+    def __init__(self, size):
+        self.root = Path(tempfile.mkdtemp(prefix="testgen-validate-"))
+        self.collectors = [Collector(self.root) for _ in range(max(1, size))]
+        # Doubles as the semaphore: a check waits here until a collector is free. Last in, first
+        # out, so the collectors already running are reused before another one is started.
+        self.idle = asyncio.LifoQueue()
+        for collector in self.collectors:
+            self.idle.put_nowait(collector)
+
+    async def collect(self, test_file):
+        collector = await self.idle.get()
+        try:
+            return await collector.collect(test_file)
+        finally:
+            self.idle.put_nowait(collector)
+
+    async def close(self):
+        await asyncio.gather(*(collector.close() for collector in self.collectors))
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class Validator:
+    # Checks each generated section before it is written: the section is assembled on its
+    # own exactly as it would be in the final file, compiled, and collected by pytest in a
+    # scratch directory laid out like tests/<api>/ (same conftest.py). Collection happens in
+    # the run's CollectorPool, so checks overlap with the generation still in flight and a
+    # hanging test module can be killed.
+
+    def __init__(self, api_name, collectors, isolated=False):
+        self.api_name = api_name
+        self.isolated = isolated
+        self.collectors = collectors
+        self.directory = collectors.root / api_name
+        self.directory.mkdir(exist_ok=True)
+        write_conftest(self.directory, isolated)
+        self.checked = 0
+
+    async def check(self, section):
+        # Returns None when the section is fine, otherwise the error to show the model.
+        content = assemble_test_file([section], api_name=self.api_name, isolated=self.isolated)
+        try:
+            compile(content, f"test_{self.api_name}_generated.py", "exec")
+        except SyntaxError as e:
+            return f"SyntaxError: {e.msg} (line {e.lineno})\n{e.text or ''}".rstrip()
+
+        self.checked += 1
+        test_file = self.directory / f"test_{self.api_name}_{self.checked}.py"
+        test_file.write_text(content)
+        try:
+            exit_code, output = await self.collectors.collect(test_file)
+        finally:
+            test_file.unlink(missing_ok=True)
+
+        if exit_code == 0:
+            return None
+        if exit_code == NO_TESTS_COLLECTED:
+            return "pytest collected no tests: the code must define a test_* function"
+        lines = output.strip().splitlines()
+        return "\n".join(lines[-ERROR_TAIL_LINES:])
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)